@@ -0,0 +1,182 @@
+import time
+from numpy import *
+from Rule import totalistic_table
+
+# Number of cells stored by each word of the packed space
+WORD_BITS = 64
+# Number of alive cells by every possible byte, used to count the bits of the words
+POPCOUNT_TABLE = array([bin(byte_value).count('1') for byte_value in range(256)],uint8)
+
+#
+#   Bit-parallel functions
+#
+def bit_pack(cells):
+    # Packs every row of the 2D array of cells in words of 64 cells,
+    # being the cell at column x the bit x%64 of the word x//64
+    columns = cells.shape[1]
+    number_words = (columns + WORD_BITS - 1) // WORD_BITS
+    packed_bytes = zeros((cells.shape[0],number_words*8),uint8)
+    packed_bytes[:,:(columns+7)//8] = packbits(cells != 0,axis=1,bitorder='little')
+    return packed_bytes.view('<u8')
+
+def bit_unpack(words, columns):
+    return unpackbits(words.view(uint8),axis=1,bitorder='little')[:,:columns]
+
+def bit_set_cells(words, columns):
+    # Flat indexes of the cells whose bit is set, only the nonzero words get unpacked
+    y, word = nonzero(words)
+    word_index, bit = nonzero(unpackbits(words[y,word].view(uint8).reshape(-1,8),axis=1,bitorder='little'))
+    return y[word_index]*columns + word[word_index]*WORD_BITS + bit
+
+def bit_count(words):
+    return int(POPCOUNT_TABLE[words.view(uint8)].sum(dtype=uint64))
+
+def bit_last_word_mask(columns):
+    # Mask of the valid bits in the last word of every row
+    remaining_bits = columns % WORD_BITS
+    if not remaining_bits: return ~uint64(0)
+    return uint64((1 << remaining_bits) - 1)
+
+def bit_shift_west(words, columns):
+    # Every cell gets the value of its west neighbour (column x-1),
+    # the first column wraps around with the last valid column
+    shifted = words << uint64(1)
+    shifted[:,1:] |= words[:,:-1] >> uint64(WORD_BITS-1)
+    last_word, last_bit = divmod(columns-1, WORD_BITS)
+    shifted[:,0] |= (words[:,last_word] >> uint64(last_bit)) & uint64(1)
+    # The bit moved out of the last valid column into the unused bits gets cleared
+    shifted[:,-1] &= bit_last_word_mask(columns)
+    return shifted
+
+def bit_shift_east(words, columns):
+    # Every cell gets the value of its east neighbour (column x+1),
+    # the last valid column wraps around with the first column
+    shifted = words >> uint64(1)
+    shifted[:,:-1] |= words[:,1:] << uint64(WORD_BITS-1)
+    last_word, last_bit = divmod(columns-1, WORD_BITS)
+    shifted[:,last_word] |= (words[:,0] & uint64(1)) << uint64(last_bit)
+    return shifted
+
+def bit_half_adder(a, b):
+    return a ^ b, a & b
+
+def bit_full_adder(a, b, c):
+    partial_sum = a ^ b
+    return partial_sum ^ c, (a & b) | (c & partial_sum)
+
+def bit_count_neighbours(words, columns):
+    """Counts the 8 neighbours of every cell with bit-sliced adders
+
+    Returns
+    -------
+    tuple
+        The 4 words planes with the bits of weight 1, 2, 4 and 8 of the count
+    """
+    west = bit_shift_west(words, columns)
+    east = bit_shift_east(words, columns)
+    # The rows wrap around vertically as in the toroidal padding
+    neighbours = (
+        roll(west,1,axis=0), roll(words,1,axis=0), roll(east,1,axis=0),
+        west, east,
+        roll(west,-1,axis=0), roll(words,-1,axis=0), roll(east,-1,axis=0),
+    )
+    # Tree of adders, the 8 bits of weight 1 become a 4 bits number
+    sum_a, carry_a = bit_full_adder(neighbours[0], neighbours[1], neighbours[2])
+    sum_b, carry_b = bit_full_adder(neighbours[3], neighbours[4], neighbours[5])
+    sum_c, carry_c = bit_half_adder(neighbours[6], neighbours[7])
+    bit_1, carry_d = bit_full_adder(sum_a, sum_b, sum_c)
+    sum_e, carry_e = bit_full_adder(carry_a, carry_b, carry_c)
+    bit_2, carry_f = bit_half_adder(sum_e, carry_d)
+    bit_4, bit_8 = bit_half_adder(carry_e, carry_f)
+    return bit_1, bit_2, bit_4, bit_8
+
+def bit_count_equals(count_bits, count):
+    # Words with the bits set in the cells whose neighbours count is equal to count
+    result = ~zeros_like(count_bits[0])
+    for i, bit in enumerate(count_bits):
+        result &= bit if (count >> i) & 1 else ~bit
+    return result
+
+def bit_count_in_table(count_bits, table):
+    # Words with the bits set in the cells whose neighbours count has a 1 in the table (9 entries)
+    result = zeros_like(count_bits[0])
+    for count in range(9):
+        if table[count]: result |= bit_count_equals(count_bits, count)
+    return result
+
+def bit_next_generation(words, columns, rule_table):
+    count_bits = bit_count_neighbours(words, columns)
+    surviving_cells = words & bit_count_in_table(count_bits, rule_table[9:])
+    born_cells = ~words & bit_count_in_table(count_bits, rule_table[:9])
+    new_words = surviving_cells | born_cells
+    new_words[:,-1] &= bit_last_word_mask(columns)
+    return new_words
+
+
+class BitCellularAutomaton():
+    """Compact backend that stores 64 cells by uint64 word and computes the
+    generations with bit-parallel adder logic, sharing the interface of the
+    CUDACellularAutomaton so it can be used in its place
+
+    The space exchanged with the CellularAutomaton is always the padded 2D
+    array of ubyte, so the save, upload and shannon entropy keep working
+    through the conversion made by get_space
+    """
+
+    def __init__(self,space,dimensions):
+        # Number of valid cells by side
+        self.dimensions = (dimensions[0],dimensions[1])
+        self.words = bit_pack(zeros(self.dimensions,ubyte))
+        self.rule = None
+        self.alive_cells = 0
+
+    #
+    # Class methods
+    #
+    def initial_configuration(self,space,alive_cells,rule):
+        start_time = time.time()
+        self.words = bit_pack(space[1:-1,1:-1])
+        self.alive_cells = bit_count(self.words)
+        # The bit adders count the neighbours, the table of the rule gets reduced to 18 entries
+        self.rule = totalistic_table(rule)
+        end_time = time.time()
+        print('<--- Initial configuration update ({:.6f}s) --->'.format(end_time-start_time))
+
+    def clear(self):
+        self.words[:] = 0
+        self.alive_cells = 0
+
+    def change_cell(self,index,alive:bool):
+        # The index comes from the padded space as (column, row)
+        x, y = index[0]-1, index[1]-1
+        word, bit = divmod(x, WORD_BITS)
+        old_cell_value = int((self.words[y,word] >> uint64(bit)) & uint64(1))
+        if alive: self.words[y,word] |= uint64(1) << uint64(bit)
+        else: self.words[y,word] &= ~(uint64(1) << uint64(bit))
+        self.alive_cells += int(alive) - old_cell_value
+
+    def next_generation(self):
+        start_time = time.time()
+        new_words = bit_next_generation(self.words,self.dimensions[1],self.rule)
+        changed_words = new_words ^ self.words
+        self.words = new_words
+        self.alive_cells = bit_count(self.words)
+        # The changes get returned as the flat indexes of the valid cells that changed
+        changed_cells = bit_set_cells(changed_words,self.dimensions[1])
+        end_time = time.time()
+        print('<--- Next generation ({:.6f}s) --->'.format(end_time-start_time))
+        return changed_cells
+
+    #
+    # Getters and setters
+    #
+    def get_alive_cells(self):
+        return self.alive_cells
+
+    def get_space(self):
+        # Conversion to the padded space with the toroidal padding applied
+        space = zeros((self.dimensions[0]+2,self.dimensions[1]+2),ubyte)
+        space[1:-1,1:-1] = bit_unpack(self.words,self.dimensions[1])
+        space[0] = space[-2]; space[-1] = space[1]
+        space[:,0] = space[:,-2]; space[:,-1] = space[:,1]
+        return space
@@ -0,0 +1,198 @@
+from numpy import *
+from Constant import MATRIX_BIN_TO_DEC, BOUNDARY_TOROIDAL, BOUNDARY_DEAD, BOUNDARY_REFLECTIVE, BOUNDARY_KLEIN
+
+#
+#   Boundary of the space
+#
+def cpu_boundary_padding(space, boundary=BOUNDARY_TOROIDAL):
+    # The padding rows and columns copy the cells given by the boundary, the columns go
+    # first so the corners of the rows get the padding of the columns
+    if boundary == BOUNDARY_DEAD:
+        space[0] = 0; space[-1] = 0
+        space[:,0] = 0; space[:,-1] = 0
+    elif boundary == BOUNDARY_REFLECTIVE:
+        space[1:-1,0] = space[1:-1,1]; space[1:-1,-1] = space[1:-1,-2]
+        space[0] = space[1]; space[-1] = space[-2]
+    else:
+        space[1:-1,0] = space[1:-1,-2]; space[1:-1,-1] = space[1:-1,1]
+        # The Klein bottle reverses the columns when crossing the top and bottom
+        if boundary == BOUNDARY_KLEIN: space[0] = space[-2,::-1]; space[-1] = space[1,::-1]
+        else: space[0] = space[-2]; space[-1] = space[1]
+
+def cpu_boundary_source(y, x, rows, columns, boundary=BOUNDARY_TOROIDAL):
+    """Valid cells copied by the cells at (y,x) in coordinates of the valid cells, which
+    can be up to 1 cell out of the space, with the index arithmetic of the boundary
+
+    Returns
+    -------
+    tuple
+        The rows and columns of the cells copied and the mask of the cells that copy one,
+        the cells out of a dead boundary don't copy any
+    """
+    y, x = broadcast_arrays(y,x)
+    out_y = (y < 0) | (y >= rows); out_x = (x < 0) | (x >= columns)
+    if boundary == BOUNDARY_DEAD:
+        inside = ~(out_y | out_x)
+        return where(inside,y,0), where(inside,x,0), inside
+    if boundary == BOUNDARY_REFLECTIVE: return clip(y,0,rows-1), clip(x,0,columns-1), ones(y.shape,bool_)
+    x = x % columns
+    if boundary == BOUNDARY_KLEIN: x = where(out_y,columns-1-x,x)
+    return y % rows, x, ones(y.shape,bool_)
+
+def cpu_mirror_padding(space, y, x, boundary=BOUNDARY_TOROIDAL):
+    # Copies the valid cell (y,x) only into the padding cells that copy it, which are in its
+    # rows and columns of the padding or, for the Klein bottle, in its reversed column
+    rows, columns = space.shape[0]-2, space.shape[1]-2
+    padding_y, padding_x = meshgrid([y,-1,rows],[x,-1,columns,columns-1-x],indexing='ij')
+    source_y, source_x, copies = cpu_boundary_source(padding_y,padding_x,rows,columns,boundary)
+    padding = copies & (source_y == y) & (source_x == x) & ((padding_y < 0) | (padding_y >= rows) | (padding_x < 0) | (padding_x >= columns))
+    space[padding_y[padding]+1,padding_x[padding]+1] = space[y+1,x+1]
+
+#
+#   Vectorized CPU functions
+#
+def cpu_define_cell_status(anchor_cells, neighbourhood_codes, rule_table):
+    # The new state of every cell comes from the row of its state in the table of the rule, by the
+    # code of its neighbourhood. With 2 states the rows are the same, so the first one is enough
+    if len(rule_table) == 2: return rule_table[0].take(neighbourhood_codes)
+    return rule_table.take(anchor_cells.astype(uint32)*rule_table.shape[1] + neighbourhood_codes)
+
+def cpu_neighbourhood_codes(space):
+    # Conversion of the 3x3 neighbourhood of every valid cell into its decimal number. The
+    # rows of the conversion matrix are the weights 1, 2, 4 times 8^row, so the 3 bits of
+    # every row of the windows get computed once and the rows of each window get joined
+    # Only the alive cells (state 1) are part of the code, not the dying states
+    rows, columns = space.shape[0]-2, space.shape[1]-2
+    alive_cells = space == 1
+    row_codes = zeros((rows+2,columns),uint16)
+    for x in (2,1,0):
+        row_codes <<= 1
+        row_codes += alive_cells[:,x:x+columns]
+    codes = row_codes[2:] << 6
+    codes |= row_codes[1:-1] << 3
+    codes |= row_codes[:-2]
+    return codes
+
+def cpu_neighbourhood_frecuency(codes):
+    # Histogram of the 512 possible neighbourhoods
+    return bincount(codes.ravel(),minlength=512)
+
+def cpu_next_generation(space, rule, neighbourhood_codes=None):
+    """Computes the next generation of the valid cells of a padded 2D space, the codes
+    of the neighbourhoods can be given when they're already known (e.g. from the
+    histogram of the shannon entropy)
+
+    Returns
+    -------
+    tuple
+        The new valid cells without padding, the count of alive cells (state 1) and the
+        boolean mask of the cells that changed its status
+    """
+    anchor_cells = space[1:-1,1:-1]
+    if neighbourhood_codes is None: neighbourhood_codes = cpu_neighbourhood_codes(space)
+    new_cells = cpu_define_cell_status(anchor_cells, neighbourhood_codes, rule)
+    changes_space = new_cells != anchor_cells
+    return new_cells, int(count_nonzero(new_cells == 1)), changes_space
+
+#
+#   Tiled CPU functions
+#
+def cpu_tiles_to_compute(active_tiles, boundary=BOUNDARY_TOROIDAL):
+    # The tiles that changed and their 8 neighbour tiles, wrapping around as the toroid
+    tiles_to_compute = copy(active_tiles)
+    for y in (-1,0,1):
+        for x in (-1,0,1):
+            tiles_to_compute |= roll(active_tiles,(y,x),axis=(0,1))
+    # The Klein bottle reverses the columns across the top and bottom, so the whole opposite
+    # row of tiles gets computed when a tile of the first or last row changed
+    if boundary == BOUNDARY_KLEIN:
+        if active_tiles[0].any(): tiles_to_compute[-1] = True
+        if active_tiles[-1].any(): tiles_to_compute[0] = True
+    return tiles_to_compute
+
+def cpu_next_generation_tiles(space, rule, active_tiles, tile_size, boundary=BOUNDARY_TOROIDAL):
+    """Computes in place the next generation of a padded 2D space, only for the tiles
+    that changed in the last generation and their neighbours
+
+    Returns
+    -------
+    tuple
+        The difference in the count of alive cells, the boolean mask of the tiles that
+        changed and the flat indexes (y*columns+x) of the valid cells that changed
+    """
+    changed_tiles = zeros_like(active_tiles)
+    new_tiles = []
+    # Every tile gets computed from the old space before any of them is applied
+    for tile_y, tile_x in argwhere(cpu_tiles_to_compute(active_tiles,boundary)):
+        # The slices get clipped by the padding in the last tiles of the space
+        y = tile_y*tile_size; x = tile_x*tile_size
+        new_cells, alive_cells, changes_space = cpu_next_generation(space[y:y+tile_size+2,x:x+tile_size+2],rule)
+        if changes_space.any():
+            changed_tiles[tile_y,tile_x] = True
+            new_tiles.append((y,x,new_cells,changes_space))
+
+    added_cells = 0
+    columns = space.shape[1]-2
+    changed_cells = [zeros(0,intp)]
+    for y, x, new_cells, changes_space in new_tiles:
+        tile_space = space[y+1:y+1+new_cells.shape[0],x+1:x+1+new_cells.shape[1]]
+        added_cells += int(count_nonzero(new_cells == 1)) - int(count_nonzero(tile_space == 1))
+        tile_space[:] = new_cells
+        y_changed, x_changed = nonzero(changes_space)
+        changed_cells.append((y_changed+y)*columns + x_changed+x)
+    return added_cells, changed_tiles, concatenate(changed_cells)
+
+#
+#   Incremental neighbourhood histogram
+#
+# Fraction of the cells that can change for the codes to be updated instead of computed again
+INCREMENTAL_CHANGES_FRACTION = 1/128
+# Offsets of the cells of a 3x3 window
+NEIGHBOURS_Y = array([-1,-1,-1,0,0,0,1,1,1])
+NEIGHBOURS_X = array([-1,0,1,-1,0,1,-1,0,1])
+
+def cpu_update_neighbourhood_codes(space, codes, neighbourhood_frecuency, changed_cells, boundary=BOUNDARY_TOROIDAL):
+    """Updates in place the codes of the neighbourhoods and their 512 bins histogram
+    after the changed cells (flat indexes) flipped, recomputing only the cells that have
+    one of them in their 3x3 window. The padded space must be up to date, padding included
+
+    With more changed cells than INCREMENTAL_CHANGES_FRACTION of the space all the codes
+    get computed again, which is faster than the updates by then
+    """
+    if not len(changed_cells): return
+    rows, columns = codes.shape
+    if len(changed_cells) > codes.size*INCREMENTAL_CHANGES_FRACTION:
+        codes[:] = cpu_neighbourhood_codes(space)
+        neighbourhood_frecuency[:] = cpu_neighbourhood_frecuency(codes)
+        return
+    y_changed, x_changed = divmod(asarray(changed_cells),columns)
+    # Only the changed cells of the borders have copies in the padding, which are in their rows
+    # and columns of the padding or, for the Klein bottle, in their reversed columns
+    border = (y_changed == 0) | (y_changed == rows-1) | (x_changed == 0) | (x_changed == columns-1)
+    y_border = y_changed[border]; x_border = x_changed[border]
+    y_copies = stack((full_like(y_border,-1),full_like(y_border,rows)),axis=1)[:,:,newaxis]
+    x_copies = stack((x_border,full_like(x_border,-1),full_like(x_border,columns),columns-1-x_border),axis=1)[:,newaxis,:]
+    y_copies = concatenate((y_copies,y_border[:,newaxis,newaxis]),axis=1)
+    source_y, source_x, copies = cpu_boundary_source(y_copies,x_copies,rows,columns,boundary)
+    copies &= (source_y == y_border[:,newaxis,newaxis]) & (source_x == x_border[:,newaxis,newaxis])
+    copies &= (y_copies < 0) | (y_copies >= rows) | (x_copies < 0) | (x_copies >= columns)
+    y_copies, x_copies = broadcast_arrays(y_copies,x_copies)
+    y_copies = concatenate((y_changed,y_copies[copies])); x_copies = concatenate((x_changed,x_copies[copies]))
+    # The valid cells around each cell and copy, counted only once
+    y_affected = (y_copies[:,newaxis] + NEIGHBOURS_Y).ravel()
+    x_affected = (x_copies[:,newaxis] + NEIGHBOURS_X).ravel()
+    inside = (y_affected >= 0) & (y_affected < rows) & (x_affected >= 0) & (x_affected < columns)
+    affected = sort(y_affected[inside]*columns + x_affected[inside])
+    affected = affected[concatenate(([True],affected[1:] != affected[:-1]))]
+    y_affected, x_affected = divmod(affected,columns)
+    # The windows read the padded space with flat indexes, the padding has the cells of the boundary
+    flat_space = space.ravel()
+    padded_cells = (y_affected+1)*(columns+2) + x_affected+1
+    new_codes = zeros(len(affected),uint16)
+    for y in range(3):
+        for x in range(3):
+            new_codes += (flat_space[padded_cells + (y-1)*(columns+2) + x-1] == 1) * uint16(MATRIX_BIN_TO_DEC[y,x])
+    flat_codes = codes.reshape(-1)
+    neighbourhood_frecuency -= bincount(flat_codes[affected],minlength=512)
+    neighbourhood_frecuency += bincount(new_codes,minlength=512)
+    flat_codes[affected] = new_codes
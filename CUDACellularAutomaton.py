@@ -1,105 +1,289 @@
 import time
 from numpy import *
-from numba import cuda
-from Constant import MATRIX_BIN_TO_DEC
+from numba import cuda, types
+from Constant import MATRIX_BIN_TO_DEC, BOUNDARY_TOROIDAL, BOUNDARIES, KERNEL_BOUNDARY_DEAD, KERNEL_BOUNDARY_REFLECTIVE, KERNEL_BOUNDARY_KLEIN
+from CPUCellularAutomaton import cpu_tiles_to_compute, cpu_boundary_padding, INCREMENTAL_CHANGES_FRACTION
+
+# Side of the 2D blocks of threads, each block loads its tile of cells plus the
+# 1 cell halo into shared memory
+CUDA_BLOCK_SIDE = 16
+CUDA_TILE_SIDE = CUDA_BLOCK_SIDE + 2
+# The tiled kernels run a block of threads by tile with a thread by cell, and a
+# block can't have more than 1024 threads
+CUDA_MAX_TILE_SIZE = 32
+# Threads by block of the kernels that run over a list
+CUDA_LIST_BLOCK_SIZE = 256
 
 #
 #   Kernels and CUDA functions
 #
 @cuda.jit(device=True)
-def cuda_define_cell_status(alive_neighbours, anchor_cell, rule):
-    if not anchor_cell: # Dead cell
-        if alive_neighbours >= rule[2] and alive_neighbours <= rule[3]:
-            return 1 # A cell borns
-        else:
-            return 0 # The cell keeps as dead
+def cuda_window_number(window,conversion_matrix):
+    # Loops through the window of the neighbourhood and adds the powers of 2 that
+    # correspond to a live cell (state 1). This allows to convert the neighbourhood
+    # into a decimal number to be identified
+    neighbourhood_number = 0
+    for y_nn in range(3):
+        for x_nn in range(3):
+            if window[y_nn,x_nn] == 1: neighbourhood_number += conversion_matrix[y_nn,x_nn]
+    return neighbourhood_number
+
+@cuda.jit(device=True)
+def cuda_compute_cell(anchor_cell,neighbourhood_number,out_space,alive_cells,changes_space,rule,y,x):
+    # The state of the cell and the code of the 3x3 neighbourhood, from the global or the
+    # shared memory, index the table of the rule
+    # Clears whichever the past result was in the changes_space array
+    changes_space[y+1,x+1] = 0
+    # Assigns the new value of the cell
+    new_cell_value = rule[anchor_cell,neighbourhood_number]
+    out_space[y+1,x+1] =  new_cell_value
+    # When the status of the cell changed
+    if new_cell_value != anchor_cell:
+        # Puts 1 if the status of the cell changed
+        changes_space[y+1,x+1] = 1
+        # Updates the alive cells, the dying cells don't count
+        if new_cell_value == 1: cuda.atomic.add(alive_cells, 0, 1)
+        elif anchor_cell == 1: cuda.atomic.add(alive_cells, 0, -1)
+        return True
+    return False
 
-    # Alive cell
-    if anchor_cell:
-        if alive_neighbours < rule[0]: # Undepopulation
-            return 0 # The cell dies in the next generation
-        if alive_neighbours > rule[1]: # Overpopulation
-            return 0 # The cell dies in the next generation
-        else: 
-            return 1 # The cell lives
+@cuda.jit(device=True)
+def cuda_boundary_source(y,x,rows,columns,boundary):
+    # Valid cell copied by the cell at (y,x) in coordinates of the valid cells, which can be
+    # up to 1 cell out of the space, or (-1,-1) when it's out of a dead boundary
+    out_y = y < 0 or y >= rows; out_x = x < 0 or x >= columns
+    if not out_y and not out_x: return y, x
+    if boundary == KERNEL_BOUNDARY_DEAD: return -1, -1
+    if boundary == KERNEL_BOUNDARY_REFLECTIVE:
+        if y < 0: y = 0
+        elif y >= rows: y = rows-1
+        if x < 0: x = 0
+        elif x >= columns: x = columns-1
+        return y, x
+    x = x % columns
+    # The Klein bottle reverses the columns when crossing the top and bottom
+    if boundary == KERNEL_BOUNDARY_KLEIN and out_y: x = columns-1-x
+    return y % rows, x
 
 @cuda.jit(device=True)
-def cuda_count_neighbours(window):
-    count = 0
-    for y in range(3):
-        for x in range(3):
-            count += window[y,x]
-    # If count greater than 0, gets the anchor cell value substracted
-    if count > 0: count -= window[1,1]
-    return count
+def cuda_mirror_padding(space,y,x,value,boundary):
+    # Copies the value of a valid cell at the borders into the padding cells that copy it, which
+    # are in its rows and columns of the padding or, for the Klein bottle, in its reversed column
+    rows = space.shape[0]-2; columns = space.shape[1]-2
+    if y != 0 and y != rows-1 and x != 0 and x != columns-1: return
+    for i in range(3):
+        padding_y = y if i == 0 else (-1 if i == 1 else rows)
+        for j in range(4):
+            padding_x = x if j == 0 else (-1 if j == 1 else (columns if j == 2 else columns-1-x))
+            if padding_y >= 0 and padding_y < rows and padding_x >= 0 and padding_x < columns: continue
+            source_y, source_x = cuda_boundary_source(padding_y,padding_x,rows,columns,boundary)
+            if source_y == y and source_x == x: space[padding_y+1,padding_x+1] = value
+
+@cuda.jit(device=True)
+def cuda_load_tile(space,tile):
+    # The threads of the block copy between all of them the tile of the padded space
+    # that their cells read, halo included, clipped by the limits of the space
+    start_y = cuda.blockIdx.y*CUDA_BLOCK_SIDE; start_x = cuda.blockIdx.x*CUDA_BLOCK_SIDE
+    for i in range(cuda.threadIdx.y*CUDA_BLOCK_SIDE + cuda.threadIdx.x,CUDA_TILE_SIDE*CUDA_TILE_SIDE,CUDA_BLOCK_SIDE*CUDA_BLOCK_SIDE):
+        y = start_y + i // CUDA_TILE_SIDE; x = start_x + i % CUDA_TILE_SIDE
+        if (y < space.shape[0]) and (x < space.shape[1]): tile[i // CUDA_TILE_SIDE,i % CUDA_TILE_SIDE] = space[y,x]
+    # Every cell of the tile must be loaded before any thread reads it
+    cuda.syncthreads()
 
 @cuda.jit
-def cuda_next_generation(space,out_space,alive_cells,changes_space,rule):
-    x = cuda.threadIdx.x
-    y = cuda.blockIdx.x
+def cuda_next_generation(space,out_space,alive_cells,changes_space,rule,conversion_matrix,neighbourhood_frecuency,count_frecuency,boundary):
+    # The cells of the borders also write the padding of the new space, so it's ready to
+    # be swapped with the actual one without any copy
+    x, y = cuda.grid(2)
+    tile = cuda.shared.array((CUDA_TILE_SIDE,CUDA_TILE_SIDE),types.uint8)
+    # The code of each neighbourhood gives the new state and, when counted, goes to the
+    # histogram of the block, so the histogram of the generation needs no other kernel
+    block_frecuency = cuda.shared.array(512,types.int32)
+    thread_index = cuda.threadIdx.y*CUDA_BLOCK_SIDE + cuda.threadIdx.x
+    if count_frecuency:
+        for i in range(thread_index,512,CUDA_BLOCK_SIDE*CUDA_BLOCK_SIDE): block_frecuency[i] = 0
+    cuda_load_tile(space,tile)
     # If its not the last 2 rows/columns
-    if (x < space.shape[0]-2) and (y < space.shape[0]-2):
-        # Clears whichever the past result was in the changes_space array
-        changes_space[y+1,x+1] = 0
-        # Count of neighbours
-        alive_neighbours = cuda_count_neighbours(space[y:y+3,x:x+3])
-        # Assigns the new value of the cell
-        anchor_cell = space[y+1,x+1]; new_cell_value = cuda_define_cell_status(alive_neighbours,anchor_cell,rule)
-        out_space[y+1,x+1] =  new_cell_value
-        # When the status of the cell changed
-        if new_cell_value != anchor_cell:
-            # Puts 1 if the status of the cell changed
-            changes_space[y+1,x+1] = 1
-            # Updates the alive cells
-            cuda.atomic.add(alive_cells, 0, 1 if new_cell_value == 1 else -1)
+    if (x < space.shape[1]-2) and (y < space.shape[0]-2):
+        tile_y = cuda.threadIdx.y; tile_x = cuda.threadIdx.x
+        neighbourhood_number = cuda_window_number(tile[tile_y:tile_y+3,tile_x:tile_x+3],conversion_matrix)
+        if count_frecuency: cuda.atomic.add(block_frecuency,neighbourhood_number,1)
+        cuda_compute_cell(tile[tile_y+1,tile_x+1],neighbourhood_number,out_space,alive_cells,changes_space,rule,y,x)
+        cuda_mirror_padding(out_space,y,x,out_space[y+1,x+1],boundary)
+    if count_frecuency:
+        cuda.syncthreads()
+        for i in range(thread_index,512,CUDA_BLOCK_SIDE*CUDA_BLOCK_SIDE):
+            if block_frecuency[i]: cuda.atomic.add(neighbourhood_frecuency,i,block_frecuency[i])
+
+@cuda.jit
+def cuda_next_generation_tiles(space,out_space,alive_cells,changes_space,rule,conversion_matrix,tiles,changed_tiles):
+    # Each block computes one of the tiles listed, with one thread by cell
+    tile_y = tiles[cuda.blockIdx.x,0]; tile_x = tiles[cuda.blockIdx.x,1]
+    y = tile_y*cuda.blockDim.y + cuda.threadIdx.y
+    x = tile_x*cuda.blockDim.x + cuda.threadIdx.x
+    if (x < space.shape[1]-2) and (y < space.shape[0]-2):
+        neighbourhood_number = cuda_window_number(space[y:y+3,x:x+3],conversion_matrix)
+        if cuda_compute_cell(space[y+1,x+1],neighbourhood_number,out_space,alive_cells,changes_space,rule,y,x):
+            changed_tiles[tile_y,tile_x] = 1
 
 @cuda.jit
-def cuda_update_results(space,out_space):
-    x = cuda.threadIdx.x
-    y = cuda.blockIdx.x
-    # Evaluating if the coordinates correspond to those at the padding
-    # and change it to copy the values of the borders to achieve the
-    # toroid array
-    x_index = -2 if x == 0 else (1 if x == (space.shape[0]-1) else x)
-    y_index = -2 if y == 0 else (1 if y == (space.shape[0]-1) else y)
-    space[y,x] = out_space[y_index,x_index]
+def cuda_update_results_tiles(space,out_space,tiles,boundary):
+    tile_y = tiles[cuda.blockIdx.x,0]; tile_x = tiles[cuda.blockIdx.x,1]
+    y = tile_y*cuda.blockDim.y + cuda.threadIdx.y
+    x = tile_x*cuda.blockDim.x + cuda.threadIdx.x
+    if (x < space.shape[1]-2) and (y < space.shape[0]-2):
+        space[y+1,x+1] = out_space[y+1,x+1]
+        # The padding only gets updated for the cells of the computed tiles
+        cuda_mirror_padding(space,y,x,space[y+1,x+1],boundary)
 
 @cuda.jit
 def cuda_shannons_probability(space,neighbourhood_frecuency,conversion_matrix):
-    x = cuda.threadIdx.x
-    y = cuda.blockIdx.x
+    x, y = cuda.grid(2)
+    tile = cuda.shared.array((CUDA_TILE_SIDE,CUDA_TILE_SIDE),types.uint8)
+    # Each block counts its neighbourhoods in shared memory, so the global histogram
+    # only gets one atomic operation by block and neighbourhood found
+    block_frecuency = cuda.shared.array(512,types.int32)
+    thread_index = cuda.threadIdx.y*CUDA_BLOCK_SIDE + cuda.threadIdx.x
+    for i in range(thread_index,512,CUDA_BLOCK_SIDE*CUDA_BLOCK_SIDE): block_frecuency[i] = 0
+    cuda_load_tile(space,tile)
     # If its not the last 2 rows/columns
-    if (x < space.shape[0]-2) and (y < space.shape[0]-2):
-        neighbourhood_number = 0
-        # Loops through the windows of the neighbourhood and adds to the
-        # neighbhourhood_number variable the powers of 2 that corresponds
-        # to a live cell. This allows to convert the neighbourhood into
-        # a decimal number to be identified
-        for y_nn in range(y,y+3):
-            for x_nn in range(x,x+3):
-                if space[y_nn,x_nn]: neighbourhood_number += conversion_matrix[y_nn-y,x_nn-x]
-        # Increments the neighbourhood frecuency
-        cuda.atomic.add(neighbourhood_frecuency ,neighbourhood_number, 1)
+    if (x < space.shape[1]-2) and (y < space.shape[0]-2):
+        tile_y = cuda.threadIdx.y; tile_x = cuda.threadIdx.x
+        neighbourhood_number = cuda_window_number(tile[tile_y:tile_y+3,tile_x:tile_x+3],conversion_matrix)
+        # Increments the neighbourhood frecuency of the block
+        cuda.atomic.add(block_frecuency,neighbourhood_number,1)
+    cuda.syncthreads()
+    for i in range(thread_index,512,CUDA_BLOCK_SIDE*CUDA_BLOCK_SIDE):
+        if block_frecuency[i]: cuda.atomic.add(neighbourhood_frecuency,i,block_frecuency[i])
+
+@cuda.jit(device=True)
+def cuda_neighbourhood_number(space,changes_space,conversion_matrix,dying_state,boundary,y,x,before):
+    rows = space.shape[0]-2; columns = space.shape[1]-2
+    neighbourhood_number = 0
+    for y_nn in range(3):
+        for x_nn in range(3):
+            value = space[y+y_nn,x+x_nn]
+            alive = value == 1
+            # The padding of the changes isn't updated, so the valid cell copied by the boundary
+            # is read. A changed cell was alive only if it's now in the state that follows the alive one
+            if before:
+                source_y, source_x = cuda_boundary_source(y+y_nn-1,x+x_nn-1,rows,columns,boundary)
+                if source_y >= 0 and changes_space[source_y+1,source_x+1]: alive = value == dying_state
+            if alive: neighbourhood_number += conversion_matrix[y_nn,x_nn]
+    return neighbourhood_number
 
 @cuda.jit
-def cuda_change_cell(position,space,alive_cells):
-    space[position[1],position[0]] = int(not space[position[1],position[0]])
+def cuda_update_neighbourhood_frecuency(space,changes_space,changed_cells,number_changed_cells,neighbourhood_frecuency,conversion_matrix,dying_state,boundary):
+    # A thread by changed cell of the compact list updates the neighbourhoods around the cell and
+    # its copies in the padding. Each neighbourhood gets updated only by the first changed cell of
+    # its window, through the first copy of that cell in the window
+    i = cuda.grid(1)
+    if i >= number_changed_cells[0]: return
+    rows = space.shape[0]-2; columns = space.shape[1]-2
+    y = changed_cells[i] // columns; x = changed_cells[i] % columns
+    for i_copy in range(3):
+        copy_y = y if i_copy == 0 else (-1 if i_copy == 1 else rows)
+        for j_copy in range(4):
+            copy_x = x if j_copy == 0 else (-1 if j_copy == 1 else (columns if j_copy == 2 else columns-1-x))
+            source_y, source_x = cuda_boundary_source(copy_y,copy_x,rows,columns,boundary)
+            if source_y != y or source_x != x: continue
+            for y_nn in range(copy_y-1,copy_y+2):
+                for x_nn in range(copy_x-1,copy_x+2):
+                    if y_nn < 0 or y_nn >= rows or x_nn < 0 or x_nn >= columns: continue
+                    first_changed = changed_cells[i]; first_copy = True; found_copy = False
+                    for y_window in range(y_nn-1,y_nn+2):
+                        for x_window in range(x_nn-1,x_nn+2):
+                            window_y, window_x = cuda_boundary_source(y_window,x_window,rows,columns,boundary)
+                            if window_y < 0 or not changes_space[window_y+1,window_x+1]: continue
+                            if window_y*columns + window_x < first_changed: first_changed = window_y*columns + window_x
+                            if window_y == y and window_x == x and not found_copy:
+                                found_copy = True
+                                first_copy = y_window == copy_y and x_window == copy_x
+                    if first_changed != changed_cells[i] or not first_copy: continue
+                    # The neighbourhood before the generation is the actual one with the changed cells turned back
+                    old_number = cuda_neighbourhood_number(space,changes_space,conversion_matrix,dying_state,boundary,y_nn,x_nn,True)
+                    new_number = cuda_neighbourhood_number(space,changes_space,conversion_matrix,dying_state,boundary,y_nn,x_nn,False)
+                    if old_number != new_number:
+                        cuda.atomic.add(neighbourhood_frecuency,old_number,-1)
+                        cuda.atomic.add(neighbourhood_frecuency,new_number,1)
+
+@cuda.jit
+def cuda_change_cell(position,space,alive_cells,boundary,value):
+    # The cell takes the value given, alive (1) or dead (0)
+    old_cell_value = space[position[1],position[0]]
+    space[position[1],position[0]] = value
+    cuda_mirror_padding(space,position[1]-1,position[0]-1,space[position[1],position[0]],boundary)
     # Updates the alive cells
-    cuda.atomic.add(alive_cells, 0, 1 if space[position[1],position[0]] else -1)
+    if value == 1 and old_cell_value != 1: cuda.atomic.add(alive_cells, 0, 1)
+    elif value != 1 and old_cell_value == 1: cuda.atomic.add(alive_cells, 0, -1)
+
+@cuda.jit
+def cuda_compact_changes(changes_space,changed_cells,number_changed_cells):
+    # Stream compaction of the changes, every changed cell takes the next
+    # position of the list with its flat index
+    x, y = cuda.grid(2)
+    columns = changes_space.shape[1]-2
+    if (x < columns) and (y < changes_space.shape[0]-2):
+        if changes_space[y+1,x+1]:
+            # All the changed cells get counted, but the ones past the capacity of the list aren't written
+            position = cuda.atomic.add(number_changed_cells,0,1)
+            if position < changed_cells.shape[0]: changed_cells[position] = y*columns + x
+
+@cuda.jit
+def cuda_compact_changes_tiles(changes_space,changed_cells,number_changed_cells,tiles):
+    # Same compaction only over the tiles listed, a block by tile
+    tile_y = tiles[cuda.blockIdx.x,0]; tile_x = tiles[cuda.blockIdx.x,1]
+    y = tile_y*cuda.blockDim.y + cuda.threadIdx.y
+    x = tile_x*cuda.blockDim.x + cuda.threadIdx.x
+    columns = changes_space.shape[1]-2
+    if (x < columns) and (y < changes_space.shape[0]-2):
+        if changes_space[y+1,x+1]:
+            position = cuda.atomic.add(number_changed_cells,0,1)
+            if position < changed_cells.shape[0]: changed_cells[position] = y*columns + x
+
+@cuda.jit
+def cuda_difference_space(space_before,space):
+    # The space before gets replaced by the flags of its cells that differ from the space
+    x, y = cuda.grid(2)
+    if (x < space.shape[1]-2) and (y < space.shape[0]-2):
+        space_before[y+1,x+1] = space_before[y+1,x+1] != space[y+1,x+1]
+
+@cuda.jit
+def cuda_gather_states(space,changed_cells,states):
+    i = cuda.grid(1)
+    if i < changed_cells.shape[0]:
+        columns = space.shape[1]-2
+        states[i] = space[changed_cells[i]//columns+1,changed_cells[i]%columns+1]
+
+@cuda.jit
+def cuda_record_alive_cells(alive_cells,alive_cells_record,generation):
+    alive_cells_record[generation] = alive_cells[0]
 
 @cuda.jit
 def cuda_clear_space(space,out_space):
-    x = cuda.threadIdx.x
-    y = cuda.blockIdx.x
-    space[y,x] = 0
-    out_space[y,x] = 0
+    x, y = cuda.grid(2)
+    if (x < space.shape[1]) and (y < space.shape[0]):
+        space[y,x] = 0
+        out_space[y,x] = 0
 
 class CUDACellularAutomaton():
 
-    def __init__(self,space,dimensions):
+    def __init__(self,space,dimensions,tile_size:int=0,incremental_entropy:bool=False,boundary:str=BOUNDARY_TOROIDAL):
+        if tile_size > CUDA_MAX_TILE_SIZE: raise ValueError('The tiles of the cuda backend can\'t be bigger than {} cells by side: {}'.format(CUDA_MAX_TILE_SIZE,tile_size))
         # Gets the shape of the space in only 2 dimensions
         self.dimensions = (0,0)
         self.alive_cells = array([0],int32)
+        # The kernels receive the boundary by its index
+        self.boundary = boundary
+        self.kernel_boundary = BOUNDARIES.index(boundary)
+        # When the tiles are used, only the tiles that changed in the last
+        # generation and their neighbours get computed
+        self.tile_size = tile_size
+        self.active_tiles = None
+        # When incremental, the histogram of the neighbourhoods stays in the GPU and gets
+        # updated every generation with the neighbourhoods around the changed cells
+        self.incremental_entropy = incremental_entropy
+        self.neighbourhood_frecuency_device = None
 
         # Arrays in memory of the GPU
         self.space_rule = None
@@ -107,6 +291,9 @@ class CUDACellularAutomaton():
         self.out_space_device = None
         self.alive_cells_device = None
         self.changes_space_device = None # Used to indicate which cells have changed after the generation function
+        self.changed_cells_device = None # Compact list with the flat indexes of the changed cells
+        self.number_changed_cells_device = None
+        self.number_changed_cells = None # Number of changed cells, once they've been compacted
 
     #
     # Class methods
@@ -118,33 +305,66 @@ class CUDACellularAutomaton():
         self.out_space_device = None
         self.alive_cells_device = None
         self.changes_space_device = None
-        # Assigns the memory for the arrays
-        self.space_rule = cuda.to_device(copy(rule))
-        self.space_device = cuda.device_array_like(copy(space))
-        self.out_space_device = cuda.to_device(copy(space))
-        self.alive_cells_device = cuda.to_device(array([alive_cells],uint32))
-        self.changes_space_device = cuda.device_array_like(copy(space))
-        self.conversion_matrix = cuda.to_device(copy(MATRIX_BIN_TO_DEC))
-        # Calls the kernel to update the new arrays and perform the toroidal padding assignments
+        self.neighbourhood_frecuency_device = None
+        # Assigns the memory for the arrays, the space is the only one transferred from the
+        # host, with the padding of its boundary, and gets copied to the other plane in the device
+        self.space_rule = cuda.to_device(array(rule,ubyte))
+        # State of the alive cells that don't survive, to know which changed cells were alive
+        self.dying_state = 2 % len(rule)
         start_time = time.time()
-        cuda_update_results[self.dimensions[0],self.dimensions[1]](self.space_device, self.out_space_device)
+        padded_space = array(space,ubyte)
+        cpu_boundary_padding(padded_space,self.boundary)
+        self.space_device = cuda.to_device(padded_space)
+        # Both spaces start with the padding, the dead boundary never writes it again
+        self.out_space_device = cuda.device_array(space.shape,space.dtype)
+        self.out_space_device.copy_to_device(self.space_device)
+        self.alive_cells_device = cuda.to_device(array([alive_cells],int32))
+        self.changes_space_device = cuda.device_array(space.shape,space.dtype)
+        # A quarter of the cells, with more changed cells the whole changes space is a smaller copy than their list
+        self.changed_cells_device = cuda.device_array((space.shape[0]-2)*(space.shape[1]-2)//4 + 1,int32)
+        self.number_changed_cells_device = cuda.to_device(zeros(1,int32))
+        self.conversion_matrix = cuda.to_device(copy(MATRIX_BIN_TO_DEC))
+        # Argument of the generation kernel when the histogram isn't counted
+        self.unused_frecuency_device = cuda.device_array(512,int64)
+        self.activate_tiles()
         end_time = time.time()
         print('<--- Initial configuration update ({:.6f}s) --->'.format(end_time-start_time))
 
     def clear(self):
         start_time = time.time()
-        cuda_clear_space[self.dimensions[0],self.dimensions[1]](self.space_device,self.out_space_device)
+        cuda_clear_space[self.launch_dimensions(self.dimensions)](self.space_device,self.out_space_device)
         end_time = time.time()
         print('<--- Clear of space ({:.6f}s) --->'.format(end_time-start_time))
         # Easier to delete the existing array in the GPU memory with the alive cells count and assign a new one
         self.alive_cells_device = None
         self.alive_cells_device = cuda.to_device(self.alive_cells)
+        self.neighbourhood_frecuency_device = None
+        self.activate_tiles()
+
+    def activate_tiles(self,index=None):
+        if not self.tile_size: return
+        # Without index all the tiles get computed in the next generation
+        if index is None:
+            number_tiles = (self.dimensions[0]-2 + self.tile_size-1) // self.tile_size
+            self.active_tiles = ones((number_tiles,number_tiles),bool_)
+        else: self.active_tiles[(index[1]-1)//self.tile_size,(index[0]-1)//self.tile_size] = True
+
+    def valid_dimensions(self):
+        return (self.dimensions[0]-2,self.dimensions[1]-2)
 
-    def change_cell(self,index):
-        index = array(index,int16)
+    def launch_dimensions(self,dimensions):
+        # 2D blocks of threads covering the rows and columns given, the
+        # x axis of the threads runs over the columns
+        blocks = ((dimensions[1]+CUDA_BLOCK_SIDE-1)//CUDA_BLOCK_SIDE,(dimensions[0]+CUDA_BLOCK_SIDE-1)//CUDA_BLOCK_SIDE)
+        return blocks, (CUDA_BLOCK_SIDE,CUDA_BLOCK_SIDE)
+
+    def change_cell(self,index,alive:bool):
+        index = array(index,int32)
 
         start_time = time.time()
-        cuda_change_cell[1,1](index,self.space_device,self.alive_cells_device)
+        cuda_change_cell[1,1](index,self.space_device,self.alive_cells_device,self.kernel_boundary,int(alive))
+        self.activate_tiles(index)
+        self.neighbourhood_frecuency_device = None
         end_time = time.time()
         print('<--- Change of value in cell[{},{}] ({:.6f}s) --->'.format(index[0], index[1], end_time-start_time))
         # print('GPU alive cells >> ', self.alive_cells_device.copy_to_host())
@@ -152,18 +372,122 @@ class CUDACellularAutomaton():
     def next_generation(self):
         # print(self.space_device.copy_to_host())
         start_time = time.time()
-        cuda_next_generation[self.dimensions[0],self.dimensions[1]](self.space_device,self.out_space_device,self.alive_cells_device,self.changes_space_device,self.space_rule)
-        cuda_update_results[self.dimensions[0],self.dimensions[1]](self.space_device, self.out_space_device)
-        changes_space = self.changes_space_device.copy_to_host()
+        self.step()
+        changed_cells = self.changed_cells()
         end_time = time.time()
         print('<--- Next generation ({:.6f}s) --->'.format(end_time-start_time))
-        return changes_space
+        return changed_cells
+
+    def compact_changes(self):
+        # Compacts the changes of the last generation into the list of changed cells once,
+        # returns how many cells changed even when they don't fit in the list
+        if self.number_changed_cells != None: return self.number_changed_cells
+        self.number_changed_cells_device.copy_to_device(zeros(1,int32))
+        if self.tile_size:
+            # With tiles, only the ones that changed in the last generation have changed cells
+            tiles = argwhere(self.active_tiles).astype(int32)
+            if len(tiles): cuda_compact_changes_tiles[len(tiles),(self.tile_size,self.tile_size)](self.changes_space_device,self.changed_cells_device,self.number_changed_cells_device,cuda.to_device(tiles))
+        else: cuda_compact_changes[self.launch_dimensions(self.valid_dimensions())](self.changes_space_device,self.changed_cells_device,self.number_changed_cells_device)
+        self.number_changed_cells = int(self.number_changed_cells_device.copy_to_host()[0])
+        return self.number_changed_cells
+
+    def changed_cells(self):
+        return self.copy_changed_cells(self.compact_changes(),self.changes_space_device)
+
+    def copy_changed_cells(self,number_changed_cells:int,changes_space_device):
+        # Only the list of changed cells travels to the host, not the whole changes space,
+        # unless they don't fit in the list
+        if number_changed_cells > self.changed_cells_device.shape[0]:
+            return flatnonzero(changes_space_device.copy_to_host()[1:-1,1:-1]).astype(int32)
+        return self.changed_cells_device[:number_changed_cells].copy_to_host() if number_changed_cells else zeros(0,int32)
+
+    def changed_cells_since(self,space_before_device):
+        # Cells that differ from the space given, which gets overwritten by the flags of the
+        # differences and compacted as the changes of a generation
+        cuda_difference_space[self.launch_dimensions(self.valid_dimensions())](space_before_device,self.space_device)
+        self.number_changed_cells_device.copy_to_device(zeros(1,int32))
+        cuda_compact_changes[self.launch_dimensions(self.valid_dimensions())](space_before_device,self.changed_cells_device,self.number_changed_cells_device)
+        # The list no longer holds the changes of the last generation
+        self.number_changed_cells = None
+        return self.copy_changed_cells(int(self.number_changed_cells_device.copy_to_host()[0]),space_before_device)
+
+    def next_generations(self,generations:int,shannon_entropy:bool=False,changed_cells:bool=False):
+        # The generations run in the device without copies to the host, the alive cells and the
+        # histograms of the neighbourhoods before each one are kept in device buffers, and the
+        # cells that changed through the whole batch come from a copy of the space in the device
+        start_time = time.time()
+        space_before_device = None
+        if changed_cells:
+            space_before_device = cuda.device_array_like(self.space_device)
+            space_before_device.copy_to_device(self.space_device)
+        alive_cells_record_device = cuda.device_array(generations,int32)
+        neighbourhood_frecuency_record_device = cuda.to_device(zeros((generations,512),int64)) if shannon_entropy else None
+        # Without tiles the histogram comes from the same codes that give the new states, the
+        # incremental histogram isn't updated meanwhile and gets computed again when needed
+        step_entropy = shannon_entropy and not self.tile_size
+        if step_entropy: self.neighbourhood_frecuency_device = None
+        for generation in range(generations):
+            cuda_record_alive_cells[1,1](self.alive_cells_device,alive_cells_record_device,generation)
+            if step_entropy: self.step(neighbourhood_frecuency_record_device[generation])
+            else:
+                if shannon_entropy: self.compute_neighbourhood_frecuency(neighbourhood_frecuency_record_device[generation])
+                self.step()
+        # The records get transfered once for the whole batch
+        alive_cells_record = alive_cells_record_device.copy_to_host()
+        neighbourhood_frecuency_record = neighbourhood_frecuency_record_device.copy_to_host() if shannon_entropy else None
+        changed_cells = self.changed_cells_since(space_before_device) if changed_cells else None
+        end_time = time.time()
+        print('<--- {} generations in the device ({:.6f}s) --->'.format(generations,end_time-start_time))
+        return alive_cells_record, neighbourhood_frecuency_record, changed_cells
+
+    def step(self,neighbourhood_frecuency_space=None):
+        # The histogram of the neighbourhoods before the generation gets added to the array given
+        self.number_changed_cells = None
+        if self.tile_size: self.next_generation_tiles()
+        else:
+            count_frecuency = neighbourhood_frecuency_space != None
+            if not count_frecuency: neighbourhood_frecuency_space = self.unused_frecuency_device
+            cuda_next_generation[self.launch_dimensions(self.valid_dimensions())](self.space_device,self.out_space_device,self.alive_cells_device,self.changes_space_device,self.space_rule,self.conversion_matrix,neighbourhood_frecuency_space,count_frecuency,self.kernel_boundary)
+            # The new space already has its padding, so the spaces get swapped instead of copied
+            self.space_device, self.out_space_device = self.out_space_device, self.space_device
+        if self.neighbourhood_frecuency_device != None: self.update_neighbourhood_frecuency()
+
+    def update_neighbourhood_frecuency(self):
+        number_changed_cells = self.compact_changes()
+        if not number_changed_cells: return
+        # With many changes, or more than the list holds, the histogram gets computed again
+        if number_changed_cells > self.changed_cells_device.shape[0] or number_changed_cells > (self.dimensions[0]-2)*(self.dimensions[1]-2)*INCREMENTAL_CHANGES_FRACTION:
+            self.neighbourhood_frecuency_device.copy_to_device(zeros(512,int64))
+            cuda_shannons_probability[self.launch_dimensions(self.valid_dimensions())](self.space_device,self.neighbourhood_frecuency_device,self.conversion_matrix)
+        else:
+            blocks = (number_changed_cells + CUDA_LIST_BLOCK_SIZE-1) // CUDA_LIST_BLOCK_SIZE
+            cuda_update_neighbourhood_frecuency[blocks,CUDA_LIST_BLOCK_SIZE](self.space_device,self.changes_space_device,self.changed_cells_device,self.number_changed_cells_device,self.neighbourhood_frecuency_device,self.conversion_matrix,self.dying_state,self.kernel_boundary)
+
+    def next_generation_tiles(self):
+        tiles = argwhere(cpu_tiles_to_compute(self.active_tiles,self.boundary)).astype(int32)
+        changed_tiles_device = cuda.to_device(zeros(self.active_tiles.shape,ubyte))
+        # When every tile is idle there's nothing to launch
+        if len(tiles):
+            tiles_device = cuda.to_device(tiles)
+            block_dimensions = (self.tile_size,self.tile_size)
+            cuda_next_generation_tiles[len(tiles),block_dimensions](self.space_device,self.out_space_device,self.alive_cells_device,self.changes_space_device,self.space_rule,self.conversion_matrix,tiles_device,changed_tiles_device)
+            cuda_update_results_tiles[len(tiles),block_dimensions](self.space_device,self.out_space_device,tiles_device,self.kernel_boundary)
+        self.active_tiles = changed_tiles_device.copy_to_host() != 0
 
     def shannon_entropy(self):
-        neighbourhood_frecuency_space = cuda.to_device(array([0 for i in range(512)]))
-        cuda_shannons_probability[self.dimensions[0],self.dimensions[1]](self.space_device,neighbourhood_frecuency_space,self.conversion_matrix)
+        neighbourhood_frecuency_space = cuda.to_device(zeros(512,int64))
+        self.compute_neighbourhood_frecuency(neighbourhood_frecuency_space)
         return neighbourhood_frecuency_space.copy_to_host()
 
+    def compute_neighbourhood_frecuency(self,neighbourhood_frecuency_space):
+        # The histogram kept by the incremental updates gets computed once, after that it's
+        # already the one of the actual generation
+        if self.incremental_entropy and self.neighbourhood_frecuency_device == None:
+            self.neighbourhood_frecuency_device = cuda.to_device(zeros(512,int64))
+            cuda_shannons_probability[self.launch_dimensions(self.valid_dimensions())](self.space_device,self.neighbourhood_frecuency_device,self.conversion_matrix)
+        if self.neighbourhood_frecuency_device != None: neighbourhood_frecuency_space.copy_to_device(self.neighbourhood_frecuency_device)
+        else: cuda_shannons_probability[self.launch_dimensions(self.valid_dimensions())](self.space_device,neighbourhood_frecuency_space,self.conversion_matrix)
+
     #
     # Getters and setters
     #
@@ -171,4 +495,12 @@ class CUDACellularAutomaton():
         return self.alive_cells_device.copy_to_host()[0]
 
     def get_space(self):
-        return self.space_device.copy_to_host()
\ No newline at end of file
+        return self.space_device.copy_to_host()
+
+    def get_cells_states(self,changed_cells):
+        # States of the cells given by their flat indexes, gathered in the device so only
+        # them travel to the host
+        if not len(changed_cells): return zeros(0,ubyte)
+        states_device = cuda.device_array(len(changed_cells),ubyte)
+        cuda_gather_states[(len(changed_cells)+CUDA_LIST_BLOCK_SIZE-1)//CUDA_LIST_BLOCK_SIZE,CUDA_LIST_BLOCK_SIZE](self.space_device,cuda.to_device(ascontiguousarray(changed_cells,int64)),states_device)
+        return states_device.copy_to_host()
\ No newline at end of file
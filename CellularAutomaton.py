@@ -11,10 +11,18 @@ import time
 from math import log10
 from numpy import *
 from random import random
-from Constant import MATRIX_BIN_TO_DEC,R_Life,R_2
+from Constant import MATRIX_BIN_TO_DEC,R_Life,R_2,BACKEND_NUMPY,BACKEND_BIT,BACKEND_CUDA,BACKEND_HASHLIFE,BACKEND_PARALLEL,BACKEND_NUMBA,BOUNDARY_TOROIDAL,BOUNDARIES
 from matplotlib import pyplot as plt
 
+from CPUCellularAutomaton import *
 from CUDACellularAutomaton import *
+from BitCellularAutomaton import BitCellularAutomaton
+from HashlifeCellularAutomaton import HashlifeCellularAutomaton
+from ParallelCellularAutomaton import ParallelCellularAutomaton
+from NumbaCellularAutomaton import NumbaCellularAutomaton
+from SpaceFile import SPACE_FILE_EXTENSION, save_space_file, read_space_header, load_space_file, load_checkpoint
+from PatternFile import read_pattern_header, decode_pattern
+from Rule import rule_string, compile_rule, rule_states, is_totalistic
 from Graphics import GameGraphics
 from Layouts import BottomBar
 
@@ -34,10 +42,9 @@ class CellularAutomaton():
     grid : array
         2D array of the grid space
 
-    states : dict
-        The 2 possible states [0,1] used as keys, for a tuple value that represents
-        first: The top limit of the probability of generation for the random initial
-        configuration, and second: The color used to depict the cell state
+    states : int
+        Number of states of the rule: 0 dead, 1 alive and from 2 to states-1 the
+        dying states of the rules of the Generations family
     
     generation : int
         Number of the actual generation. By default starts with the value 0
@@ -48,44 +55,85 @@ class CellularAutomaton():
     
     Methods
     -------
-    random_initial_config():
+    random_initial_config(graphic_cells,seed):
         Creates a random initial configuration taking in count the probability of each
-        state for its assingment
+        state for its assingment, reproducible with a seed
     """
 
-    def __init__(self,size,use_gpu,rule:tuple=R_Life):
+    def __init__(self,size,use_gpu,rule=R_Life,backend:str=BACKEND_NUMPY,tile_size:int=0,workers:int=1,incremental_entropy:bool=False,boundary:str=BOUNDARY_TOROIDAL):
 
-        self.dimensions = (size,size,2)
+        self.dimensions = (size,size)
         self.number_cells = size*size
-        self.actual_rule = rule
-        # Grid of 3 dimensions
-        # Mimicking the rows and columns respectively, the first 2 dimensions
-        # are the same, meanwhile the 3rd has 2 elements being the first used
-        # for the actual cell grid states, and the 2nd element to calculate
-        # the new grid for the next generation 
+        # The rule in B/S notation and its table, a row of 512 entries by state, the one the backends use
+        self.actual_rule = rule_string(rule)
+        self.rule_table = compile_rule(rule)
+        self.states = rule_states(self.rule_table)
+        # Grid of 2 dimensions, mimicking the rows and columns respectively, with the state
+        # of each cell: 0 dead, 1 alive and from 2 the dying states of the multistate rules
         self.space = zeros(self.dimensions,ubyte)
         # The padding at the first and last rows and columns is needed for the
-        # window of 3x3, used to count the number of neigbours of the anchor element
+        # window of 3x3, used to count the number of neigbours of the anchor element,
+        # and copies the cells given by the boundary (BOUNDARIES)
+        if boundary not in BOUNDARIES: raise ValueError('Unknown boundary "{}", it must be one of: {}'.format(boundary,', '.join(BOUNDARIES)))
+        self.boundary = boundary
         self.add_padding()
         # States
         self.zeros_density = 0.5
         # Dynamic variables through the process
         self.generations = 0
         self.alive_cells = 0
-        # Graphics connection
+        # Graphics connection, the counters of the bottom bar only get updated from here
+        # when the automaton runs in the same thread as the interface
         self.game_graphics = None
+        self.update_interface = True
+        # Tiles of tile_size cells by side, when greater than 0 only the tiles that
+        # changed in the last generation and their neighbours get computed
+        self.tile_size = tile_size
+        self.active_tiles = None
+        self.activate_tiles()
 
         # Record of statistical analysis
+        # The 512 bins histogram of the neighbourhoods of the last shannon entropy, and
+        # the codes of the neighbourhoods when they're still valid for the actual space
+        self.neighbourhood_frecuency = None
+        self.neighbourhood_codes = None
+        # When incremental, the codes and the histogram are kept through the generations
+        # updating only the neighbourhoods of the cells that changed
+        self.incremental_entropy = incremental_entropy
         self.density_record = []
         self.density_logarithm_record = []
         self.shannon_entropy_record = []
 
-        # If enhancement of GPU
-        self.ca_gpu = None
-        self.gpu_enhancement = use_gpu
-        if use_gpu:
+        # Backend that computes the generations, when it's not the numpy one
+        # the generations are computed by an engine with the interface of the
+        # CUDACellularAutomaton and the space is only synchronized on demand
+        self.ca_engine = None
+        self.backend = BACKEND_CUDA if use_gpu else backend
+        # Without CUDA the same kernels get compiled for the CPU
+        if self.backend == BACKEND_CUDA and not cuda.is_available():
+            print('<!!! CUDA is not available, using the numba CPU backend !!!>')
+            self.backend = BACKEND_NUMBA
+        # More than 1 worker splits the numpy computation between processes
+        if self.backend == BACKEND_NUMPY and workers > 1: self.backend = BACKEND_PARALLEL
+        self.gpu_enhancement = self.backend == BACKEND_CUDA
+        # The bit packed words and the nodes of hashlife wrap around as a torus
+        if self.backend in (BACKEND_BIT,BACKEND_HASHLIFE) and boundary != BOUNDARY_TOROIDAL: raise ValueError('The {} backend only supports the toroidal boundary'.format(self.backend))
+        self.check_rule(self.backend,rule,self.rule_table)
+        if self.backend == BACKEND_CUDA:
             print('<--- Enhancement by GPU active --->')
-            self.ca_gpu = CUDACellularAutomaton(self.space,self.dimensions)
+            self.ca_engine = CUDACellularAutomaton(self.space,self.dimensions,tile_size,incremental_entropy,boundary)
+        elif self.backend == BACKEND_BIT:
+            print('<--- Bit-packed backend active --->')
+            self.ca_engine = BitCellularAutomaton(self.space,self.dimensions)
+        elif self.backend == BACKEND_HASHLIFE:
+            print('<--- Hashlife backend active --->')
+            self.ca_engine = HashlifeCellularAutomaton(self.space,self.dimensions)
+        elif self.backend == BACKEND_NUMBA:
+            print('<--- Numba CPU backend active --->')
+            self.ca_engine = NumbaCellularAutomaton(self.space,self.dimensions,tile_size,incremental_entropy,boundary)
+        elif self.backend == BACKEND_PARALLEL:
+            print('<--- Parallel backend with {} workers active --->'.format(workers))
+            self.ca_engine = ParallelCellularAutomaton(self.space,self.dimensions,workers,boundary)
 
     #
     # Configuration functions
@@ -97,114 +145,212 @@ class CellularAutomaton():
         self.density_record.clear()
         self.density_logarithm_record.clear()
         self.shannon_entropy_record.clear()
-        self.space = zeros(self.dimensions,byte)
+        self.space = zeros(self.dimensions,ubyte)
         self.add_padding()
-        # GPU actions
-        if self.gpu_enhancement:
-            self.ca_gpu.clear()
+        self.activate_tiles()
+        self.neighbourhood_codes = None
+        # Engine actions
+        if self.ca_engine != None:
+            self.ca_engine.clear()
+
+    def activate_tiles(self,index=None):
+        if not self.tile_size: return
+        # Without index all the tiles get computed in the next generation
+        if index is None:
+            number_tiles = (self.dimensions[0] + self.tile_size-1) // self.tile_size
+            self.active_tiles = ones((number_tiles,number_tiles),bool_)
+        else: self.active_tiles[(index[1]-1)//self.tile_size,(index[0]-1)//self.tile_size] = True
+
+    def close(self):
+        # Releases the processes and shared memory of the parallel backend
+        if self.backend == BACKEND_PARALLEL: self.ca_engine.close()
 
     def set_game_graphics(self, game_graphics:GameGraphics):
         self.game_graphics = game_graphics
+        self.game_graphics.set_states(self.states)
 
     def add_padding(self):
-        rows_padding = zeros((self.dimensions[0],1,2),ubyte) # 1 row with the same number of columns and shape, except for the 2nd dimension that's only 1
-        columns_padding = zeros((1,self.dimensions[1]+2,2),ubyte) # 1 column at the first dimension with same number of rows+2 and same elements in 3rd dimension
+        rows_padding = zeros((self.dimensions[0],1),ubyte) # 1 row with the same number of columns, except for the 2nd dimension that's only 1
+        columns_padding = zeros((1,self.dimensions[1]+2),ubyte) # 1 column at the first dimension with same number of rows+2
         self.space = concatenate((rows_padding,self.space,rows_padding),axis=1)
         self.space = concatenate((columns_padding,self.space,columns_padding),axis=0)
-        self.toroid_padding()
-
-    def random_initial_config(self, graphic_cells) -> array:
-        # Loop that runs all the space elements and generates randomly an alive or dead cell
-        for y in range(1,self.dimensions[1]+1):
-            for x in range(1,self.dimensions[0]+1):
-                if  self.zeros_density > random.random(): # Probability of an alive cell is the complement of the state 0
-                    self.update_alive_cells(1)
-                    self.space[y,x,0] = 1
-                    graphic_cells[(y-1)*self.dimensions[0]+(x-1)].set_status(True)
-
-        # GPU actions
-        if self.gpu_enhancement:
-            self.ca_gpu.initial_configuration(self.space[:,:,0],self.alive_cells,self.actual_rule)
+        self.boundary_padding()
+
+    def random_initial_config(self, graphic_cells=None, seed=None) -> array:
+        # The whole space gets generated at once, each cell is alive with the probability of
+        # zeros_density, with the same configuration for the same seed
+        generator = random.default_rng(seed)
+        self.space[1:-1,1:-1] = generator.random(self.dimensions,float32) < self.zeros_density
+        self.boundary_padding()
+        self.update_alive_cells(int(count_nonzero(self.space[1:-1,1:-1])) - self.alive_cells)
+        if graphic_cells is not None: graphic_cells[:] = self.space[1:-1,1:-1]
+        self.activate_tiles()
+        self.neighbourhood_codes = None
+
+        # Engine actions
+        if self.ca_engine != None:
+            self.ca_engine.initial_configuration(self.space,self.alive_cells,self.rule_table)
 
     #
     # Update of dynamic variables and the texts showed in the interface
     #
     def update_alive_cells(self,added_cells:int):
         self.alive_cells += added_cells
-        BottomBar.bottom_bar.update_alive_cells(self.alive_cells)
+        # Without interface (headless runs) only the counter gets updated
+        if BottomBar.bottom_bar != None and self.update_interface: BottomBar.bottom_bar.update_alive_cells(self.alive_cells)
 
     def update_generations(self,added_generations:int):
         self.generations += added_generations
-        BottomBar.bottom_bar.update_generations(self.generations)
+        if BottomBar.bottom_bar != None and self.update_interface: BottomBar.bottom_bar.update_generations(self.generations)
 
     def update_zeros_density(self,density):
         self.zeros_density = density
 
+    @staticmethod
+    def check_rule(backend:str,rule,rule_table=None):
+        # The bit and hashlife backends only store 2 states, and the bit one counts the
+        # neighbours so it only runs the outer totalistic rules. Without instance, so the
+        # runs can be checked before building them
+        if rule_table is None: rule_table = compile_rule(rule)
+        if backend in (BACKEND_BIT,BACKEND_HASHLIFE) and rule_states(rule_table) > 2: raise ValueError('The {} backend only supports rules of 2 states: "{}"'.format(backend,rule))
+        if backend == BACKEND_BIT and not is_totalistic(rule_table): raise ValueError('The bit backend only supports outer totalistic rules: "{}"'.format(rule))
+
+    def supported_rule(self,rule,source:str) -> bool:
+        # The rule of a file gets checked before anything of the actual run is replaced
+        try: self.check_rule(self.backend,rule)
+        except ValueError:
+            print('!!! The rule "{}" of the {} is not supported, the actual run is kept !!!'.format(rule,source))
+            return False
+        return True
+
+    def set_rule(self,rule,update_engine:bool=True):
+        # Any rule of the Life-like family, in B/S notation or as the 4 limits, an isotropic
+        # rule in Hensel notation or a rule of the Generations family with its states
+        rule_table = compile_rule(rule)
+        self.check_rule(self.backend,rule,rule_table)
+        self.actual_rule = rule_string(rule)
+        self.rule_table = rule_table
+        self.states = rule_states(rule_table)
+        if self.game_graphics != None: self.game_graphics.set_states(self.states)
+        # The dying states that don't exist in the new rule die
+        self.space[self.space >= self.states] = 0
+        # The stable tiles of the last rule can change with the new one
+        self.activate_tiles()
+        if update_engine and self.ca_engine != None:
+            space = self.ca_engine.get_space()
+            space[space >= self.states] = 0
+            self.ca_engine.initial_configuration(space,self.alive_cells,self.rule_table)
+
     #
     # Functions while running the cellular automaton
     #
-    def define_cell_status(self,alive_neighbours, anchor_cell):
-        # Substracts the anchor cell value because the method
-        # recives the alive_neighbours count before taking in 
-        # count the value of the anchor cell
-        alive_neighbours -= anchor_cell
-
-        if not anchor_cell: # Dead cell
-            if alive_neighbours >= self.actual_rule[2] and alive_neighbours <= self.actual_rule[3]:
-                return 1 # A cell borns
-            else:
-                return 0 # The cell keeps as dead
-
-        # Alive cell
-        if anchor_cell:
-            if alive_neighbours < self.actual_rule[0]: # Undepopulation
-                return -1 # The cell dies in the next generation
-            if alive_neighbours > self.actual_rule[1]: # Overpopulation
-                return -1 # The cell dies in the next generation
-            else: 
-                return 0 # The cell lives
-
-    def toroid_padding(self):
-        self.space[0] = self.space[-2] # The first padding row is the last row with valid cells
-        self.space[-1] = self.space[1] # The last padding row is the first row with valid cells
-        self.space[:,0] = self.space[:,-2] # The first padding column is the last column with valid cells
-        self.space[:,-1] = self.space[:,1] # The last padding column is the first column with valid cells
+    def define_cell_status(self,state,neighbourhood_code):
+        # New state of a cell by its state and the code of the 3x3 neighbourhood of alive
+        # cells, where the anchor cell is the bit of weight 16 when it's alive
+        return int(self.rule_table[state,neighbourhood_code])
+
+    def boundary_padding(self):
+        # The padding rows and columns copy the valid cells given by the boundary
+        cpu_boundary_padding(self.space,self.boundary)
 
     def compute_next_generation(self):
         time_start = time.time()
         # CPU process
-        if not self.gpu_enhancement:
-            self.toroid_padding()
-            for y in range(self.dimensions[1]):
-                for x in range(self.dimensions[0]):
-                    window = copy(self.space[y:y+3,x:x+3,0])
-                    alive_neighbours = window.sum()
-                    new_status_cell = self.define_cell_status(alive_neighbours, copy(self.space[y+1,x+1,0]))
-                    # The alive cells counter gets updated
-                    self.update_alive_cells(new_status_cell)
-                    # The new status of the cell gets saved in the second column of the 3rd dimension
-                    self.space[y+1,x+1,1] = new_status_cell
-                    # Only when the new_status cell changes then 
-                    if new_status_cell != 0: self.game_graphics.update_cell_status(new_status_cell,(y,x))
-            # Once the new states have been calculated, the new changes are applied
-            self.space[:,:,0] = self.space.sum(axis=2)
-            self.space[:,:,1] -= self.space[:,:,1] # The second columns returns to zeros
-        # GPU process
+        if self.ca_engine == None:
+            self.boundary_padding()
+            # The codes of the neighbourhoods are only valid for the generation they were taken,
+            # unless they're updated incrementally with the changed cells
+            neighbourhood_codes = self.neighbourhood_codes
+            if not self.incremental_entropy: self.neighbourhood_codes = None
+            if self.tile_size:
+                added_cells, self.active_tiles, changed_cells = cpu_next_generation_tiles(self.space,self.rule_table,self.active_tiles,self.tile_size,self.boundary)
+                self.update_alive_cells(added_cells)
+                # The changed cells come only from the tiles computed
+                self.update_neighbourhood_codes(changed_cells)
+                self.update_graphic_cells(changed_cells)
+            else:
+                # When the shannon entropy of this generation was computed its codes index the rule
+                new_cells, alive_cells, changes_space = cpu_next_generation(self.space,self.rule_table,neighbourhood_codes)
+                self.space[1:-1,1:-1] = new_cells
+                # The alive cells counter gets updated
+                self.update_alive_cells(alive_cells - self.alive_cells)
+                # Only the cells that changed its status get updated in the interface
+                changed_cells = flatnonzero(changes_space)
+                self.update_neighbourhood_codes(changed_cells)
+                self.update_graphic_cells(changed_cells)
+        # Engine process
         else:
-            changed_cells = copy(self.ca_gpu.next_generation())
-            # Look for the cell changed so that it can be show in the interface
-            for y in range(1,self.dimensions[1]+1):
-                for x in range(1,self.dimensions[0]+1):
-                    if changed_cells[y,x] == 1:
-                        self.game_graphics.update_cell_status(True,(y-1,x-1),invert=True)
-            # Updates the alive cells
-            self.update_alive_cells(self.ca_gpu.get_alive_cells() - self.alive_cells)
+            self.update_engine_changes(self.ca_engine.next_generation())
     
         # Increments the generations
         self.update_generations(1)
 
         print('>> Time for compute_next_generation({}): {:.3f}s'.format(self.generations,time.time()-time_start))
-        
+
+    def compute_generations(self,generations:int,density:bool=True,density_logarithm:bool=True,shannon_entropy:bool=True):
+        # The statistics are recorded before each generation, as in the main loop
+        if self.backend not in (BACKEND_CUDA,BACKEND_NUMBA):
+            for generation in range(generations):
+                if density: self.density()
+                if density_logarithm: self.density_logarithm()
+                if shannon_entropy: self.shannon_entropy()
+                self.compute_next_generation()
+            return
+
+        time_start = time.time()
+        # The kernels run the whole batch, with the interface updated only once at the end
+        # with the cells that changed through it
+        alive_cells_record, neighbourhood_frecuency_record, changed_cells = self.ca_engine.next_generations(generations,shannon_entropy,self.game_graphics != None)
+        if density: self.density_record.extend(int(alive_cells) for alive_cells in alive_cells_record)
+        if density_logarithm: self.density_logarithm_record.extend(log10(alive_cells) for alive_cells in alive_cells_record)
+        if shannon_entropy: self.shannon_entropy_record.extend(self.frecuency_entropy(neighbourhood_frecuency) for neighbourhood_frecuency in neighbourhood_frecuency_record)
+        if changed_cells is not None: self.update_engine_changes(changed_cells)
+        else: self.update_alive_cells(self.ca_engine.get_alive_cells() - self.alive_cells)
+        self.update_generations(generations)
+
+        print('>> Time for compute_generations({}): {:.3f}s'.format(self.generations,time.time()-time_start))
+
+    def compute_generations_jump(self,exponent:int):
+        # Only the hashlife engine advances the 2^exponent generations at once,
+        # the rest of the backends compute them one by one
+        if self.backend != BACKEND_HASHLIFE:
+            for i in range(1 << exponent): self.compute_next_generation()
+            return
+
+        time_start = time.time()
+        self.update_engine_changes(self.ca_engine.next_generation(exponent))
+        self.update_generations(1 << exponent)
+
+        print('>> Time for compute_generations_jump({}): {:.3f}s'.format(self.generations,time.time()-time_start))
+
+    def update_engine_changes(self,changed_cells):
+        # The engines return the flat indexes of the cells that changed
+        # With 2 states the changed cells get flipped, the multistate ones take their new
+        # state from the engine
+        states = None
+        if self.states > 2 and (self.host_neighbourhood_codes() or self.game_graphics != None):
+            states = self.ca_engine.get_cells_states(changed_cells)
+        # The space in the host follows the engine, so the codes of the neighbourhoods
+        # can be updated without converting it
+        if self.host_neighbourhood_codes():
+            y, x = divmod(changed_cells,self.dimensions[1])
+            if states is None: self.space[y+1,x+1] ^= 1
+            else: self.space[y+1,x+1] = states
+            self.update_neighbourhood_codes(changed_cells)
+        # The cells changed get inverted in the interface, or take their new state
+        if states is None: self.update_graphic_cells(changed_cells,invert=True)
+        elif self.game_graphics != None: self.game_graphics.update_cells_status(changed_cells,states)
+        # Updates the alive cells
+        self.update_alive_cells(self.ca_engine.get_alive_cells() - self.alive_cells)
+
+    def update_graphic_cells(self,changed_cells,invert:bool=False):
+        # Without interface (headless runs) there's nothing to show
+        if self.game_graphics == None: return
+        if invert: self.game_graphics.update_cells_status(changed_cells)
+        else:
+            y, x = divmod(changed_cells,self.dimensions[1])
+            self.game_graphics.update_cells_status(changed_cells,self.space[y+1,x+1])
+
 
     #
     # Communication with external methods
@@ -212,18 +358,34 @@ class CellularAutomaton():
     def get_generations(self):
         return self.generations
 
+    def get_cells(self):
+        # Copy of the valid cells, from the engine when there's one
+        if self.ca_engine != None: return ascontiguousarray(self.ca_engine.get_space()[1:-1,1:-1])
+        return copy(self.space[1:-1,1:-1])
+
     def change_cell(self,index,alive:bool):
-        # The alive cells counter and graphical elements gets updated
-        self.update_alive_cells(1 if alive else -1)
-        
         # CPU actions
-        if not self.gpu_enhancement:
-            self.space[index[1],index[0],0] = int(alive)
-            if (1 in index) or (self.dimensions[0] in index): self.toroid_padding()
+        if self.ca_engine == None:
+            # The alive cells counter gets updated, a dying cell of the multistate rules
+            # that gets killed wasn't counted as alive
+            self.update_alive_cells(int(alive) - int(self.space[index[1],index[0]] == 1))
+            self.space[index[1],index[0]] = int(alive)
+            # Only the padding cells that copy the cell get updated
+            cpu_mirror_padding(self.space,index[1]-1,index[0]-1,self.boundary)
+            self.activate_tiles(index)
         
-        # GPU actions
+        # Engine actions
         else:
-            self.ca_gpu.change_cell(index)
+            self.ca_engine.change_cell(index,alive)
+            self.update_alive_cells(self.ca_engine.get_alive_cells() - self.alive_cells)
+        # The interface gets the new state, when the change didn't come from it
+        if self.game_graphics != None: self.game_graphics.update_cells_status(array([(index[1]-1)*self.dimensions[1] + index[0]-1]),int(alive))
+
+        # The codes of the neighbourhoods follow the change only when they're kept incrementally
+        if self.host_neighbourhood_codes():
+            self.space[index[1],index[0]] = int(alive)
+            self.update_neighbourhood_codes(array([(index[1]-1)*self.dimensions[1] + index[0]-1]))
+        else: self.neighbourhood_codes = None
     
     #
     # Statistical analysis
@@ -234,28 +396,39 @@ class CellularAutomaton():
     def density_logarithm(self):
         self.density_logarithm_record.append(log10(self.alive_cells))
     
-    def shannon_entropy(self):
-        entropy = 0
-        neighbourhood_frecuency = [ 0 for i in range(512) ]
-
+    def host_neighbourhood_codes(self) -> bool:
+        # The codes are kept in the host, except for the kernels that keep their own histogram
+        return self.incremental_entropy and self.neighbourhood_codes is not None and self.backend not in (BACKEND_CUDA,BACKEND_NUMBA)
+
+    def update_neighbourhood_codes(self,changed_cells):
+        if not self.host_neighbourhood_codes(): return
+        # The windows of the codes read the padding
+        self.boundary_padding()
+        cpu_update_neighbourhood_codes(self.space,self.neighbourhood_codes,self.neighbourhood_frecuency,changed_cells,self.boundary)
+
+    def compute_neighbourhood_frecuency(self):
+        # Histogram already up to date
+        if self.host_neighbourhood_codes(): return self.neighbourhood_frecuency
         # CPU actions
-        if not self.gpu_enhancement:
-            for y in range(self.dimensions[1]):
-                for x in range(self.dimensions[0]):
-                    window = copy(self.space[y:y+3,x:x+3,0])
-                    neighbourhood_number = (window*MATRIX_BIN_TO_DEC).sum()
-                    neighbourhood_frecuency[neighbourhood_number] += 1
-        # GPU actions
+        if self.backend not in (BACKEND_CUDA,BACKEND_NUMBA):
+            # The compact engines get converted back to the padded space
+            if self.ca_engine != None: self.space[:] = self.ca_engine.get_space()
+            else: self.boundary_padding()
+            codes = cpu_neighbourhood_codes(self.space)
+            # The numpy process reuses the codes to index the rule in the next generation
+            if self.ca_engine == None or self.incremental_entropy: self.neighbourhood_codes = codes
+            self.neighbourhood_frecuency = cpu_neighbourhood_frecuency(codes)
+        # Kernel actions, GPU or its numba CPU equivalent
         else:
-            neighbourhood_frecuency = self.ca_gpu.shannon_entropy()
+            self.neighbourhood_frecuency = array(self.ca_engine.shannon_entropy())
+        return self.neighbourhood_frecuency
 
-        probability = 0.0
-        for frecuency in neighbourhood_frecuency:
-            if frecuency: # Different of 0
-                probability = frecuency/self.number_cells
-                entropy -= probability*math.log2(probability)
+    def frecuency_entropy(self,neighbourhood_frecuency) -> float:
+        probability = neighbourhood_frecuency[neighbourhood_frecuency > 0] / self.number_cells
+        return float(-(probability*log2(probability)).sum())
 
-        self.shannon_entropy_record.append(entropy)
+    def shannon_entropy(self):
+        self.shannon_entropy_record.append(self.frecuency_entropy(self.compute_neighbourhood_frecuency()))
 
     def plot_density(self):
         if not self.density_record:
@@ -323,37 +496,122 @@ class CellularAutomaton():
     #
     # Save and upload of generations
     #
-    def save_evolution_space(self):
-        filename = './saves/CA_generation_{}.csv'.format(self.generations)
-        if self.gpu_enhancement: self.space[:,:,0] = self.ca_gpu.get_space()
+    def save_evolution_space(self,compressed:bool=False):
+        # Binary file with the cells packed by bits (a byte by cell with dying cells) and a header with the state of the automaton
+        filename = './saves/CA_generation_{}{}'.format(self.generations,SPACE_FILE_EXTENSION)
+        save_space_file(filename,self.get_cells(),self.actual_rule,self.generations,self.alive_cells,compressed)
+        print('<--- File successfully saved as \"'+filename+'\" --->')
+
+    def get_checkpoint(self) -> dict:
+        # Copy of the state of the run and its statistics, to be saved by save_checkpoint
+        return {
+            'cells': self.get_cells(),
+            'rule': self.actual_rule,
+            'generations': self.generations,
+            'alive_cells': self.alive_cells,
+            'density_record': list(self.density_record),
+            'density_logarithm_record': list(self.density_logarithm_record),
+            'shannon_entropy_record': list(self.shannon_entropy_record),
+        }
+
+    def resume_checkpoint(self,filename:str) -> bool:
+        # The run continues from the state saved in the checkpoint, it must have the size of the space
+        checkpoint = load_checkpoint(filename)
+        if checkpoint['cells'].shape != self.dimensions:
+            print('!!! The checkpoint of {}x{} cells doesn\'t fit the actual evolution space !!!'.format(*checkpoint['cells'].shape))
+            return False
+        if not self.supported_rule(checkpoint['rule'],'checkpoint'): return False
+        self.reset()
+        if self.game_graphics != None: self.game_graphics.reset()
+        self.set_rule(checkpoint['rule'],False)
+        self.space[1:-1,1:-1] = checkpoint['cells']
+        self.boundary_padding()
+        self.neighbourhood_codes = None
+        self.update_graphic_cells(flatnonzero(self.space[1:-1,1:-1]))
+        self.update_alive_cells(checkpoint['alive_cells'])
+        self.update_generations(checkpoint['generations'])
+        self.density_record.extend(checkpoint['density_record'])
+        self.density_logarithm_record.extend(checkpoint['density_logarithm_record'])
+        self.shannon_entropy_record.extend(checkpoint['shannon_entropy_record'])
+        if self.ca_engine != None: self.ca_engine.initial_configuration(self.space,self.alive_cells,self.rule_table)
+        print('<--- Run resumed at generation {} from "{}" --->'.format(self.generations,filename))
+        return True
+
+    def save_statistics(self,filename:str='',generations_step:int=1):
+        if not filename: filename = './saves/CA_statistics_{}.csv'.format(self.generations)
+        # The records not taken get filled with nan so all the columns have the same length
+        number_records = len(self.density_record) or len(self.density_logarithm_record) or len(self.shannon_entropy_record)
+        # The records can be taken every generations_step generations (jumps)
+        columns = [arange(number_records)*generations_step]
+        for record in (self.density_record,self.density_logarithm_record,self.shannon_entropy_record):
+            columns.append(array(record,float64) if record else full(number_records,nan))
         savetxt(
             filename,
-            copy(self.space[1:-1,1:-1,0]),
+            column_stack(columns),
             delimiter = ', ',
-            fmt = '% s'
+            fmt = ['%d','%g','%.6f','%.6f'],
+            header = 'generation, density, density_logarithm, shannon_entropy'
             )
-        print('<--- File successfully saved as \"'+filename+'\" --->')
-
-    def upload_evolution_space(self):
-        aux_array = genfromtxt("./saves/upload.csv",delimiter=', '); aux_shape = aux_array.shape
+        print('<--- Statistics successfully saved as \"'+filename+'\" --->')
+
+    def upload_evolution_space(self,filename:str='./saves/upload.csv'):
+        # The text files (0's and 1's separated by ", ") get fully parsed, meanwhile from the
+        # binary files only the centered rectangle that fits in the space gets read
+        if filename.endswith(('.rle','.cells')): return self.upload_pattern(filename)
+        if filename.endswith('.csv'):
+            header = None
+            aux_array = genfromtxt(filename,delimiter=', ').astype(ubyte)
+        else:
+            header = read_space_header(filename)
+            rows, columns = minimum((header['rows'],header['columns']),self.dimensions)
+            if (rows,columns) != (header['rows'],header['columns']):
+                print('<--- The file of {}x{} cells gets cropped to the space --->'.format(header['rows'],header['columns']))
+            header, aux_array = load_space_file(filename,((header['rows']-rows)//2,(header['columns']-columns)//2),(rows,columns))
+        aux_shape = aux_array.shape
         if (self.dimensions[0]-aux_shape[0] < 0) or (self.dimensions[1]-aux_shape[1] < 0):
             print('!!! The actual evolution space is smaller than the intended upload file !!!')
+        elif header != None and not self.supported_rule(header['rule'],'file'): return
         # The upload array gets loaded in the programm
         else:
             # First the space gets cleaned
             self.reset()
-            self.game_graphics.reset()
-            if self.gpu_enhancement: self.ca_gpu.clear()
+            if self.game_graphics != None: self.game_graphics.reset()
+            if self.ca_engine != None: self.ca_engine.clear()
+            # Dynamic variables, the binary files keep the generation and rule they were saved with
+            self.generations = 0
+            if header != None:
+                self.generations = header['generations']
+                self.set_rule(header['rule'],False)
+            # The states that don't exist in the rule are left dead
+            aux_array = where(aux_array < self.states,aux_array,0).astype(ubyte)
             initial_column = 1 + int((self.dimensions[1]-aux_shape[1])/2); initial_row = 1 + int((self.dimensions[0]-aux_shape[0])/2)
             # The new array gets saved in the saving_space and the evolution_space arrays
-            self.space[initial_row:initial_row+aux_shape[0],initial_column:initial_column+aux_shape[1],0] = aux_array
-            self.toroid_padding()
-            # The graphical cells gets updated with the value of the new array
-            for y in range(initial_row,initial_row+aux_shape[0]):
-                for x in range(initial_column,initial_column+aux_shape[1]):
-                    self.game_graphics.update_cell_status(bool(self.space[y,x,0]),[(y-1),(x-1)])
-            # Dynamic variables
-            self.alive_cells = int(aux_array.sum())
-            self.generations = 0
-            if self.gpu_enhancement: self.ca_gpu.initial_configuration(self.space[:,:,0],self.alive_cells,self.actual_rule)
+            self.space[initial_row:initial_row+aux_shape[0],initial_column:initial_column+aux_shape[1]] = aux_array
+            self.boundary_padding()
+            self.neighbourhood_codes = None
+            # The graphical cells gets updated with the alive and dying cells of the new array
+            self.update_graphic_cells(flatnonzero(self.space[1:-1,1:-1]))
+            self.alive_cells = int(count_nonzero(aux_array == 1))
+            if self.ca_engine != None: self.ca_engine.initial_configuration(self.space,self.alive_cells,self.rule_table)
             print('<--- New configuration successfully uploaded --->')
+
+    def upload_pattern(self,filename:str):
+        # The RLE and .cells patterns get decoded straight into the space, centered and
+        # cropped when they're bigger than it
+        rows, columns, rule = read_pattern_header(filename)
+        if rows > self.dimensions[0] or columns > self.dimensions[1]:
+            print('<--- The pattern of {}x{} cells gets cropped to the space --->'.format(rows,columns))
+        self.reset()
+        if self.game_graphics != None: self.game_graphics.reset()
+        # The rule of the pattern replaces the actual one when it's in B/S notation
+        if rule != None:
+            try: self.set_rule(rule,False)
+            except ValueError: print('!!! The rule "{}" of the pattern is not supported, the actual rule is kept !!!'.format(rule))
+        self.update_alive_cells(decode_pattern(filename,self.space[1:-1,1:-1],((self.dimensions[0]-rows)//2,(self.dimensions[1]-columns)//2)))
+        # The states that don't exist in the rule are left dead
+        self.space[self.space >= self.states] = 0
+        self.boundary_padding()
+        self.neighbourhood_codes = None
+        self.update_graphic_cells(flatnonzero(self.space[1:-1,1:-1]))
+        if self.ca_engine != None: self.ca_engine.initial_configuration(self.space,self.alive_cells,self.rule_table)
+        print('<--- Pattern "{}" successfully uploaded --->'.format(filename))
@@ -0,0 +1,55 @@
+import time
+import threading
+from SpaceFile import save_checkpoint
+
+class CheckpointThread(threading.Thread):
+    """Thread that writes the checkpoints of a run, so the generations don't wait
+    for the packing and writing of the files
+
+    A checkpoint is due every generations_interval generations or time_interval seconds
+    (0 disables each one). Only the last checkpoint submitted gets written, if a new one
+    arrives while the previous is waiting the previous gets discarded
+    """
+
+    def __init__(self,filename:str,generations_interval:int=1000,time_interval:float=60.0):
+        super().__init__(daemon=True)
+        self.filename = filename
+        self.generations_interval = generations_interval
+        self.time_interval = time_interval
+        # Generation and time of the last checkpoint submitted
+        self.last_generations = 0
+        self.last_time = time.time()
+        # Checkpoint waiting to be written
+        self.pending = None
+        self.pending_event = threading.Event()
+        self.done = False
+
+    def run(self):
+        while True:
+            self.pending_event.wait()
+            self.pending_event.clear()
+            checkpoint, self.pending = self.pending, None
+            if checkpoint != None:
+                time_start = time.time()
+                save_checkpoint(self.filename,**checkpoint)
+                print('<--- Checkpoint of generation {} saved as "{}" ({:.3f}s) --->'.format(checkpoint['generations'],self.filename,time.time()-time_start))
+            if self.done and self.pending == None: return
+
+    def due(self,generations:int) -> bool:
+        if generations == self.last_generations: return False
+        # After a reset the generations start again from 0
+        if self.generations_interval and abs(generations-self.last_generations) >= self.generations_interval: return True
+        return bool(self.time_interval) and time.time()-self.last_time >= self.time_interval
+
+    def submit(self,checkpoint:dict):
+        # The checkpoint must be a copy of the state, it gets written while the run goes on
+        self.last_generations = checkpoint['generations']
+        self.last_time = time.time()
+        self.pending = checkpoint
+        self.pending_event.set()
+
+    def stop(self):
+        # The checkpoint waiting gets written before the thread ends
+        self.done = True
+        self.pending_event.set()
+        self.join()
@@ -37,9 +37,36 @@ MATRIX_BIN_TO_DEC = array([
     [64 , 128 , 256],
 ])
 
-# Rules
-R_Life = (2, 3, 3, 3)
-R_2 = (7, 7, 2, 2)
+# Rules in B/S notation, the neighbours counts that make a cell be born and survive
+R_Life = 'B3/S23'
+R_2 = 'B2/S7'
+R_HighLife = 'B36/S23'
+R_DayAndNight = 'B3678/S34678'
+R_Seeds = 'B2/S'
+R_tLife = 'B3/S2-i34q' # Isotropic non-totalistic, in Hensel notation
+R_BriansBrain = 'B2/S/C3' # Generations, with the dying states after the alive one
+R_StarWars = 'B2/S345/C4'
+
+# Backends used to compute the generations
+BACKEND_NUMPY = 'numpy'
+BACKEND_BIT = 'bit'
+BACKEND_CUDA = 'cuda'
+BACKEND_NUMBA = 'numba'
+BACKEND_HASHLIFE = 'hashlife'
+BACKEND_PARALLEL = 'parallel'
+
+# Boundary of the space, by the cells that its padding copies: the opposite side (toroidal),
+# none (dead), the cells of the border (reflective) or the opposite side with the columns
+# reversed when crossing the top or bottom (Klein bottle)
+BOUNDARY_TOROIDAL = 'toroidal'
+BOUNDARY_DEAD = 'dead'
+BOUNDARY_REFLECTIVE = 'reflective'
+BOUNDARY_KLEIN = 'klein'
+BOUNDARIES = [BOUNDARY_TOROIDAL,BOUNDARY_DEAD,BOUNDARY_REFLECTIVE,BOUNDARY_KLEIN]
+# The kernels receive the boundary by its index
+KERNEL_BOUNDARY_DEAD = BOUNDARIES.index(BOUNDARY_DEAD)
+KERNEL_BOUNDARY_REFLECTIVE = BOUNDARIES.index(BOUNDARY_REFLECTIVE)
+KERNEL_BOUNDARY_KLEIN = BOUNDARIES.index(BOUNDARY_KLEIN)
 
 # Structures
 GLIDER = array(
@@ -8,6 +8,13 @@ class GameGraphics():
 
     game_graphics = None
     cells_colors = [WHITE,LIGHT_BLACK_2]
+    # Factor of each step of zoom, and minimum number of cells by side of the most zoomed view
+    ZOOM_STEP = 1.25
+    MIN_VISIBLE_CELLS = 4
+    # Cells sampled by side of each block when several cells fall in the same pixel
+    LOD_SAMPLES = 2
+    # Exponent of the 2^exponent generations advanced by the key J
+    JUMP_EXPONENT = 8
 
     # Singleton Class
     def get_game_graphics(number_columns:int=0 ,grid:Grid=None, side_bar:SideBar=None, bottom_bar:BottomBar=None):
@@ -22,15 +29,14 @@ class GameGraphics():
         # Grid for the cells
         self.grid = grid
 
-        # Array of cells
-        self.cells = []
-        self.group_cells = pygame.sprite.Group()
+        # Array with the status of the cells, drawn in a single surface
         self.space_side_number_elements = number_columns
-        self.create_cells(self.grid.get_element_size())
+        # Palette of the states, as the level of each state between the dead and alive colors
+        self.set_states(2)
 
         # Mouse button states
         self.click_pressed = False
-        self.changed_cells = []
+        self.changed_cells = set()
         self.actual_structure = array([]) # Array for placing pre-defined structures in the evolution space
         self.structure_just_printed = False
 
@@ -46,6 +52,7 @@ class GameGraphics():
         self.add_graphical_element( self.side_bar )
         self.add_graphical_element( self.bottom_bar )
         self.collidable_elements.add(self.side_bar.get_graphical_sprites())
+        self.create_cells()
         # Set of the elements that must be executed their respective exit function
         self.next_exit_elements = set()
         self.next_stop_pressed = set()
@@ -53,14 +60,12 @@ class GameGraphics():
     def reset(self):
         # Mouse button states
         self.click_pressed = False
-        self.changed_cells = []
+        self.changed_cells = set()
         # Set of the elements that must be executed their respective exit function
         self.next_exit_elements = set()
         self.next_stop_pressed = set()
         # kills all the cells
-        for cell in self.cells:
-            cell.alive = False
-            cell.color_cell()
+        self.cells[:] = 0
 
 
     # PyGame loop related methods
@@ -75,22 +80,30 @@ class GameGraphics():
                 if event.button == 1: # Left click
                     self.click_pressed = False
                     self.structure_just_printed = False
-                    # The 'status_changed_click' variable in the cells returns to False
-                    while self.changed_cells: self.changed_cells.pop().status_changed_click = False
+                    # The cells can change their status again in the next click
+                    self.changed_cells.clear()
                 if event.button == 3: # Right click
                     if self.actual_structure.size: # There's an structure waiting to be located in the evolution space
                         self.actual_structure = np.rot90(self.actual_structure)
             if event.type == pygame.MOUSEWHEEL:
-                print(event)
+                # The zoom keeps in place the cell under the pointer
+                cell = self.get_view_position(pygame.mouse.get_pos())
+                if cell is not None: self.set_zoom(self.zoom*GameGraphics.ZOOM_STEP**event.y,cell)
             # Looks for key press
             elif event.type == pygame.KEYDOWN:
+                # The arrows move the view a tenth of the cells shown
+                if event.key == pygame.K_LEFT: self.move_view(0,-0.1*self.get_view_span())
+                if event.key == pygame.K_RIGHT: self.move_view(0,0.1*self.get_view_span())
+                if event.key == pygame.K_UP: self.move_view(-0.1*self.get_view_span(),0)
+                if event.key == pygame.K_DOWN: self.move_view(0.1*self.get_view_span(),0)
                 if event.key == pygame.K_n: 
-                    self.cellular_automaton.compute_next_generation()
-                    # Statistical analysis
-                    self.cellular_automaton.density()
-                    self.cellular_automaton.density_logarithm()
-                    self.cellular_automaton.shannon_entropy()
+                    # Next generation with its statistical analysis
+                    self.cellular_automaton.compute_generations(1)
                     print('<--- Next Generation --->')
+                if event.key == pygame.K_j:
+                    # Jump of 2^JUMP_EXPONENT generations, at once with the hashlife backend
+                    self.cellular_automaton.compute_generations_jump(GameGraphics.JUMP_EXPONENT)
+                    print('<--- Jump of 2^{} Generations --->'.format(GameGraphics.JUMP_EXPONENT))
         return False
 
     def run_logic(self):
@@ -136,7 +149,7 @@ class GameGraphics():
 
         window.fill(LIGHT_BLACK_2)
 
-        self.group_cells.draw(window)
+        self.draw_cells(window)
         for graphical_element in self.drawable_elements:
             graphical_element.draw(window)
 
@@ -146,27 +159,124 @@ class GameGraphics():
     def add_graphical_element(self,element):
         self.drawable_elements.append(element)
 
-    def create_cells(self,cell_size):
-        # The number of cells gets created
-        for row in range(self.space_side_number_elements):
-            for column in range(self.space_side_number_elements):
-                cell_aux = Cell(cell_size,(column+1,row+1)) # The columns and rows gets added 1 to compensate the padding of the logic array
-                self.cells.append(cell_aux)
-                self.group_cells.add(cell_aux)
-        # The cells get located in the grid
-        self.grid.locate_elements(self.cells)
+    def create_cells(self):
+        self.cells = np.zeros((self.space_side_number_elements,self.space_side_number_elements),np.ubyte)
+        self.grid_surface = pygame.Surface((int(self.grid.size[0]),int(self.grid.size[1])))
+        # The view starts showing the whole space
+        self.zoom = 1.0
+        self.view_origin = np.zeros(2) # Row and column of the top left corner of the view, in cells
+        self.update_view()
+
+    # View of the space, zoom and movement
+    def get_view_span(self):
+        return self.space_side_number_elements/self.zoom
+
+    def get_view_position(self,position):
+        # Row and column (fractional) of the space under a position of the window, None outside the grid
+        if self.grid.get_element_index(position) == None: return None
+        x = (position[0]-self.grid.coord[0])/int(self.grid.size[0]); y = (position[1]-self.grid.coord[1])/int(self.grid.size[1])
+        return self.view_origin + np.array([y,x])*self.get_view_span()
+
+    def set_zoom(self,zoom,center=None):
+        # The center (row and column in cells) stays in the same place of the grid
+        zoom = float(np.clip(zoom,1.0,max(1.0,self.space_side_number_elements/GameGraphics.MIN_VISIBLE_CELLS)))
+        if center is None: center = self.view_origin + self.get_view_span()/2
+        self.view_origin = center - (center-self.view_origin)*self.zoom/zoom
+        self.zoom = zoom
+        self.update_view()
+
+    def zoom_in(self):
+        self.set_zoom(self.zoom*GameGraphics.ZOOM_STEP)
+
+    def zoom_out(self):
+        self.set_zoom(self.zoom/GameGraphics.ZOOM_STEP)
+
+    def focus(self):
+        # Back to the view of the whole space
+        self.zoom = 1.0
+        self.view_origin[:] = 0
+        self.update_view()
+
+    def move_view(self,rows,columns):
+        self.view_origin = self.view_origin + np.array([rows,columns])
+        self.update_view()
+
+    def update_view(self):
+        span = self.get_view_span()
+        # The view can't go beyond the limits of the space
+        self.view_origin = np.clip(self.view_origin,0.0,self.space_side_number_elements-span)
+        # Only the window of cells under the view gets drawn
+        start_row, start_column = self.view_origin
+        end_row, end_column = np.minimum(np.ceil(self.view_origin+span),self.space_side_number_elements)
+        self.view_rows = (int(start_row),int(end_row)); self.view_columns = (int(start_column),int(end_column))
+        # When several cells fall in the same pixel they get aggregated in square blocks
+        self.block_size = max(1,int(span/int(min(self.grid.size))))
+        # The cells left after the last whole block, less than a pixel, get shown with it
+        number_rows = (self.view_rows[1]-self.view_rows[0])//self.block_size
+        number_columns = (self.view_columns[1]-self.view_columns[0])//self.block_size
+        pixel_columns, pixel_rows = self.grid.get_pixel_elements((start_column,start_row),(span,span))
+        pixel_columns = np.where(pixel_columns < 0,-1,np.minimum((pixel_columns-self.view_columns[0])//self.block_size,number_columns-1))
+        pixel_rows = np.where(pixel_rows < 0,-1,np.minimum((pixel_rows-self.view_rows[0])//self.block_size,number_rows-1))
+        # Flat index of the block shown by each pixel of the grid, the arrays of the surfaces are
+        # indexed as [x,y] and the pixels of the padding show the extra corner block
+        side = number_columns+1
+        self.pixel_cells = pixel_rows[np.newaxis,:]*side + pixel_columns[:,np.newaxis]
+        self.pixel_cells[(pixel_columns < 0)[:,np.newaxis] | (pixel_rows < 0)[np.newaxis,:]] = -1
+        if self.bottom_bar != None: self.bottom_bar.update_space_dimension_zoom(self.space_side_number_elements,round(self.zoom*100))
+
+    def set_states(self,states:int):
+        self.states = states
+        # The dying states fade from the alive color to the dead one as they get closer to dying
+        self.state_levels = np.zeros(256,np.uint16)
+        self.state_levels[1] = 255
+        self.state_levels[2:states] = 255*(states-np.arange(2,states)) // (states-1)
+
+    def get_view_levels(self):
+        # Level from 0 (dead) to 255 (alive) of the cells or blocks in the view, with an
+        # extra row and column for the color of the padding
+        cells = self.cells[self.view_rows[0]:self.view_rows[1],self.view_columns[0]:self.view_columns[1]]
+        # The levels of the states get looked up only for the cells sampled
+        if self.block_size == 1: levels = self.state_levels[cells]
+        else:
+            # Only a few cells by side of each block get sampled with strided views, so
+            # the cost depends on the pixels of the grid and not on the size of the space
+            number_rows = cells.shape[0]//self.block_size; number_columns = cells.shape[1]//self.block_size
+            samples = min(self.block_size,GameGraphics.LOD_SAMPLES)
+            offsets = np.arange(samples)*self.block_size//samples
+            levels = np.zeros((number_rows,number_columns),np.uint16)
+            for row_offset in offsets:
+                for column_offset in offsets:
+                    levels += self.state_levels[cells[row_offset::self.block_size,column_offset::self.block_size][:number_rows,:number_columns]]
+            levels //= samples**2
+        levels_padded = np.full((levels.shape[0]+1,levels.shape[1]+1),256,np.uint16)
+        levels_padded[:-1,:-1] = levels
+        return levels_padded
+
+    def draw_cells(self,window):
+        # Gradient from the dead to the alive color by level and the color of the padding, mapped
+        # to the pixel format of the surface so each pixel is a single lookup
+        dead_color = np.array(GameGraphics.cells_colors[0]); alive_color = np.array(GameGraphics.cells_colors[1])
+        colors = np.vstack((dead_color + np.outer(np.arange(256)/255,alive_color-dead_color),LIGHT_BLACK_2)).astype(np.ubyte)
+        colors = pygame.surfarray.map_array(self.grid_surface,colors[np.newaxis])[0]
+        pygame.surfarray.blit_array(self.grid_surface,colors[self.get_view_levels().ravel().take(self.pixel_cells)])
+        window.blit(self.grid_surface,self.grid.coord)
 
     def change_cells_status(self):
-        for cell in pygame.sprite.spritecollide(self.pointer, self.group_cells, False):
-            # If there's an structure then it's printed
-            if self.actual_structure.size:
-                self.print_structure(cell.index)
-            # If the cell changed it's status
-            if not self.structure_just_printed:
-                if cell.change_status():
-                    self.changed_cells.append(cell)
-                    # The kill/born of the cell get's also changed in the logic
-                    self.cellular_automaton.change_cell(cell.index,cell.alive)
+        view_position = self.get_view_position(pygame.mouse.get_pos())
+        if view_position is None: return
+        element_index = (int(view_position[1]),int(view_position[0]))
+        # The columns and rows gets added 1 to compensate the padding of the logic array
+        index = (element_index[0]+1,element_index[1]+1)
+        # If there's an structure then it's printed
+        if self.actual_structure.size:
+            self.print_structure(index)
+        # The cell changes it's status once by click
+        if not self.structure_just_printed and index not in self.changed_cells:
+            self.changed_cells.add(index)
+            # The dead cells become alive and the alive or dying ones dead
+            self.cells[element_index[1],element_index[0]] = 0 if self.cells[element_index[1],element_index[0]] else 1
+            # The kill/born of the cell get's also changed in the logic
+            self.cellular_automaton.change_cell(index,bool(self.cells[element_index[1],element_index[0]]))
 
     def print_structure(self,index_start_cell):
         if index_start_cell[0] <= (self.grid.num_cols - 2):
@@ -174,10 +284,8 @@ class GameGraphics():
             for row in range(3):
                 for column in range(3):
                     new_status = bool(self.actual_structure[row,column])
-                    aux_cell = self.cells[(row+index_start_cell[1]-1)*self.grid.num_cols+index_start_cell[0]-1+column]
-                    aux_cell.alive = new_status
-                    aux_cell.update()
-                    if new_status: self.cellular_automaton.change_cell(aux_cell.index,True)
+                    self.cells[row+index_start_cell[1]-1,index_start_cell[0]-1+column] = new_status
+                    if new_status: self.cellular_automaton.change_cell((index_start_cell[0]+column,index_start_cell[1]+row),True)
                     self.structure_just_printed = True
         self.actual_structure = np.array([])
 
@@ -191,56 +299,14 @@ class GameGraphics():
     def get_cells(self):
         return self.cells
 
-    def update_cell_status(self,status,cell_position,invert:bool=False):
-        cell_aux = self.cells[ cell_position[0]*self.space_side_number_elements + cell_position[1]]
-        # When invert active changes the state of the cell to the contrary of the current cell state
-        if invert: cell_aux.set_status(not cell_aux.alive)
-        # Specifies an specific status for the cell
-        else: self.cells[ cell_position[0]*self.space_side_number_elements + cell_position[1]].set_status(True if status == 1 else False)
-
-
-
-
-
-
-class Cell(pygame.sprite.Sprite):
-
-    def __init__(self, size:tuple, index:tuple, alive:bool=False):
-        super().__init__()
-
-        self.status_changed_click = False
-        self.alive = alive
-        # Index of the cell in the general grid
-        self.index = index
-        # The cell and the rect inside gets defined
-        self.image = pygame.Surface(size)
-        self.image.fill(GameGraphics.cells_colors[int(self.alive)])
-        # The rect of the cell is asigned so in 
-        # further methods can be used to move it
-        self.rect = self.image.get_rect()
-
-    def update(self):
-        # Updates the background color of the cell
-        self.image.fill(GameGraphics.cells_colors[int(self.alive)])
-
-    def resize(self,size:tuple):
-        self.rect.width, self.rect.height = size
-
-    def move(self,coord:tuple):
-        self.rect.x = coord[0]
-        self.rect.y = coord[1]
-
-    def color_cell(self):
-        self.image.fill(GameGraphics.cells_colors[int(self.alive)])
-
-    def set_status(self,status):
-        self.alive = status
-        self.color_cell()
-
-    def change_status(self):
-        if not self.status_changed_click:
-            self.alive = not self.alive
-            self.color_cell()
-            self.status_changed_click = True
-            return True
-        return False
\ No newline at end of file
+    def set_cells(self,cells):
+        # The status array gets replaced by a snapshot of the simulation
+        self.cells = cells
+
+    def update_cells_status(self,changed_cells,statuses=None):
+        # The cells come as the flat indexes of the space (row*columns+column)
+        rows, columns = np.divmod(changed_cells,self.space_side_number_elements)
+        # Without statuses changes the state of the cells to the contrary of the current cell state
+        if statuses is None: self.cells[rows,columns] ^= 1
+        # Specifies an specific status for each cell
+        else: self.cells[rows,columns] = statuses
@@ -0,0 +1,320 @@
+import time
+from collections import OrderedDict
+from numpy import *
+from CPUCellularAutomaton import cpu_next_generation
+
+# Maximum number of canonical nodes kept in the table before evicting the least recently used,
+# the nodes still referenced by the ones kept (as children or results) stay in memory
+HASHLIFE_MAX_NODES = 1 << 20
+
+
+class HashlifeNode():
+    """Node of the quadtree, a square of 2^level cells by side made of 4 nodes of the level below
+
+    The nodes are canonical, there's only one node for each combination of children, so
+    the results of advancing a node can be saved in the node itself and reused everywhere
+    the same pattern appears
+    """
+
+    __slots__ = ('level','nw','ne','sw','se','population','results')
+
+    def __init__(self,level,nw=None,ne=None,sw=None,se=None,population=0):
+        self.level = level
+        self.nw = nw; self.ne = ne
+        self.sw = sw; self.se = se
+        self.population = population
+        # Center node of the level below advanced 2^key generations
+        self.results = {}
+
+
+class HashlifeCellularAutomaton():
+    """Quadtree engine with memoized canonical nodes (Hashlife), sharing the interface
+    of the CUDACellularAutomaton so it can be used in its place
+
+    The toroidal space is advanced as the center of a node covering 2x2 copies of it.
+    When the side of the space is a power of 2 the copies are the same node, otherwise
+    the space is the top left corner of a power of 2 root and the window of the copies
+    gets built from its nodes shifted across the wrap, so the space never leaves the quadtree.
+
+    The next_generation method accepts an exponent to jump 2^exponent generations at once
+    """
+
+    def __init__(self,space,dimensions,max_nodes:int=HASHLIFE_MAX_NODES):
+        # Number of valid cells by side
+        self.dimensions = (dimensions[0],dimensions[1])
+        self.side = int(dimensions[0])
+        self.power_of_two = self.side >= 2 and not (self.side & (self.side-1))
+        # Level of the node that covers the 2x2 copies of the space, its result
+        # covers the whole space for jumps of up to 2^(window_level-2) generations
+        self.window_level = (self.side-1).bit_length() + 1
+        if self.window_level < 2: self.window_level = 2
+        self.max_exponent = self.window_level - 2
+        self.max_nodes = max_nodes
+        self.rule = None
+        self.clear_nodes()
+        # Space as a node, in its top left corner when its side isn't a power of 2
+        self.root = self.empty(self.window_level-1)
+
+    #
+    # Canonical nodes table
+    #
+    def clear_nodes(self):
+        self.nodes = OrderedDict()
+        # Nodes at an offset of the square of 4 nodes, by the 4 nodes and the offset
+        self.shifts = {}
+        self.dead_leaf = HashlifeNode(0,population=0)
+        self.alive_leaf = HashlifeNode(0,population=1)
+        self.empty_nodes = [self.dead_leaf]
+
+    def join(self,nw,ne,sw,se):
+        key = (nw,ne,sw,se)
+        node = self.nodes.get(key)
+        if node != None:
+            self.nodes.move_to_end(key)
+            return node
+        node = HashlifeNode(nw.level+1,nw,ne,sw,se,nw.population+ne.population+sw.population+se.population)
+        self.nodes[key] = node
+        # Eviction of the least recently used node, the nodes still referenced keep
+        # working but stop being shared with the new equal nodes. Its results get
+        # dropped so they don't keep alive the nodes they reference
+        if len(self.nodes) > self.max_nodes: self.nodes.popitem(last=False)[1].results.clear()
+        return node
+
+    def empty(self,level):
+        while len(self.empty_nodes) <= level:
+            child = self.empty_nodes[-1]
+            self.empty_nodes.append(self.join(child,child,child,child))
+        return self.empty_nodes[level]
+
+    #
+    # Hashlife algorithm
+    #
+    def center(self,node):
+        return self.join(node.nw.se,node.ne.sw,node.sw.ne,node.se.nw)
+
+    def subnodes(self,node):
+        # The 9 overlapping nodes of the level below, from left to right and top to bottom
+        nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+        return (
+            nw, self.join(nw.ne,ne.nw,nw.se,ne.sw), ne,
+            self.join(nw.sw,nw.se,sw.nw,sw.ne), self.join(nw.se,ne.sw,sw.ne,se.nw), self.join(ne.sw,ne.se,se.nw,se.ne),
+            sw, self.join(sw.ne,se.nw,sw.se,se.sw), se,
+        )
+
+    def base_step(self,node):
+        # A node of 4x4 cells, its 2x2 center gets advanced 1 generation with the rule
+        new_cells = cpu_next_generation(self.node_to_array(node),self.rule)[0]
+        leaves = [self.alive_leaf if cell else self.dead_leaf for cell in new_cells.flat]
+        return self.join(*leaves)
+
+    def step(self,node,exponent):
+        """Center of the node advanced 2^exponent generations, the exponent can't be
+        greater than the level of the node minus 2"""
+        # The empty space stays empty, unless the rule gives birth to cells without neighbours
+        if node.population == 0 and not self.rule[0,0]: return self.empty(node.level-1)
+        result = node.results.get(exponent)
+        if result != None: return result
+
+        if node.level == 2:
+            result = self.base_step(node)
+        else:
+            subnodes = self.subnodes(node)
+            # At full speed each half of the jump is done by a different stage,
+            # otherwise only the second stage advances the generations
+            if exponent == node.level-2:
+                stage_exponent = exponent-1
+                c = [self.step(subnode,stage_exponent) for subnode in subnodes]
+            else:
+                stage_exponent = exponent
+                c = [self.center(subnode) for subnode in subnodes]
+            result = self.join(
+                self.step(self.join(c[0],c[1],c[3],c[4]),stage_exponent),
+                self.step(self.join(c[1],c[2],c[4],c[5]),stage_exponent),
+                self.step(self.join(c[3],c[4],c[6],c[7]),stage_exponent),
+                self.step(self.join(c[4],c[5],c[7],c[8]),stage_exponent),
+            )
+        node.results[exponent] = result
+        return result
+
+    def jump(self,exponent):
+        if self.power_of_two:
+            window = self.join(self.root,self.root,self.root,self.root)
+            result = self.step(window,exponent)
+            # The result is centered in the copies, shifted half space in both axes
+            self.root = self.join(result.se,result.sw,result.ne,result.nw)
+        else:
+            # The window starts a quarter of its side before the space, so the result
+            # starts with the space in its top left corner
+            start = -(1 << (self.window_level-2)) % self.side
+            window = self.wrapped_node(start,start,self.window_level,{})
+            self.root = self.crop(self.step(window,exponent),self.side)
+
+    #
+    # Nodes of the toroidal space when its side isn't a power of 2
+    #
+    def shift(self,nw,ne,sw,se,y,x):
+        """Node of the level of the 4 nodes given at the offset (y,x) of the square they
+        form, with the offsets between 0 and the side of the nodes"""
+        side = 1 << nw.level
+        if y % side == 0 and x % side == 0: return (nw,ne,sw,se)[2*(y//side) + x//side]
+        if nw.population + ne.population + sw.population + se.population == 0: return self.empty(nw.level)
+        key = (nw,ne,sw,se,y,x)
+        node = self.shifts.get(key)
+        if node != None: return node
+        # Each quadrant of the node is at an offset of a square of 4 grandchildren
+        grandchildren = (
+            (nw.nw,nw.ne,ne.nw,ne.ne),
+            (nw.sw,nw.se,ne.sw,ne.se),
+            (sw.nw,sw.ne,se.nw,se.ne),
+            (sw.sw,sw.se,se.sw,se.se),
+        )
+        half = side >> 1
+        quadrants = []
+        for quadrant_y in (y,y+half):
+            for quadrant_x in (x,x+half):
+                grid_y = quadrant_y // half; grid_x = quadrant_x // half
+                offset_y = quadrant_y % half; offset_x = quadrant_x % half
+                # The last grandchildren have no square after them, they're at the end of the one before
+                if grid_y == 3: grid_y, offset_y = 2, half
+                if grid_x == 3: grid_x, offset_x = 2, half
+                quadrants.append(self.shift(grandchildren[grid_y][grid_x],grandchildren[grid_y][grid_x+1],grandchildren[grid_y+1][grid_x],grandchildren[grid_y+1][grid_x+1],offset_y,offset_x))
+        node = self.join(*quadrants)
+        # The shifts are only a cache, emptied when they reach the size of the table
+        if len(self.shifts) >= self.max_nodes: self.shifts.clear()
+        self.shifts[key] = node
+        return node
+
+    def root_node(self,grid_y,grid_x,level):
+        # Node of the root at the position (grid_y,grid_x) of the grid of nodes of the level
+        node = self.root
+        if grid_y >= (1 << (node.level-level)) or grid_x >= (1 << (node.level-level)): return self.empty(level)
+        while node.level > level:
+            half = 1 << (node.level-level-1)
+            node = ((node.nw,node.ne),(node.sw,node.se))[grid_y >= half][grid_x >= half]
+            grid_y %= half; grid_x %= half
+        return node
+
+    def wrapped_node(self,y,x,level,wrapped_nodes):
+        """Node of the toroidal space with its top left corner at the cell (y,x), the nodes
+        that cross the wrap get joined from their quadrants"""
+        key = (y,x,level)
+        node = wrapped_nodes.get(key)
+        if node != None: return node
+        side = 1 << level
+        if y+side <= self.side and x+side <= self.side:
+            grid_y = y // side; grid_x = x // side
+            node = self.shift(
+                self.root_node(grid_y,grid_x,level),self.root_node(grid_y,grid_x+1,level),
+                self.root_node(grid_y+1,grid_x,level),self.root_node(grid_y+1,grid_x+1,level),
+                y % side,x % side,
+            )
+        else:
+            half = side >> 1
+            next_y = (y+half) % self.side; next_x = (x+half) % self.side
+            node = self.join(
+                self.wrapped_node(y,x,level-1,wrapped_nodes),self.wrapped_node(y,next_x,level-1,wrapped_nodes),
+                self.wrapped_node(next_y,x,level-1,wrapped_nodes),self.wrapped_node(next_y,next_x,level-1,wrapped_nodes),
+            )
+        wrapped_nodes[key] = node
+        return node
+
+    def crop(self,node,side,y=0,x=0):
+        # Node with only the cells of the space, the ones past the side given get cleared
+        node_side = 1 << node.level
+        if node.population == 0 or (y+node_side <= side and x+node_side <= side): return node
+        if y >= side or x >= side: return self.empty(node.level)
+        half = node_side >> 1
+        return self.join(
+            self.crop(node.nw,side,y,x),self.crop(node.ne,side,y,x+half),
+            self.crop(node.sw,side,y+half,x),self.crop(node.se,side,y+half,x+half),
+        )
+
+    #
+    # Conversion between nodes and arrays
+    #
+    def array_to_node(self,cells,level):
+        if level == 0: return self.alive_leaf if cells[0,0] else self.dead_leaf
+        if not cells.any(): return self.empty(level)
+        half = 1 << (level-1)
+        return self.join(
+            self.array_to_node(cells[:half,:half],level-1), self.array_to_node(cells[:half,half:],level-1),
+            self.array_to_node(cells[half:,:half],level-1), self.array_to_node(cells[half:,half:],level-1),
+        )
+
+    def node_to_array(self,node,cells=None,y=0,x=0):
+        if cells is None: cells = zeros((1 << node.level,1 << node.level),ubyte)
+        if node.population == 0: return cells
+        if node.level == 0:
+            cells[y,x] = 1
+            return cells
+        half = 1 << (node.level-1)
+        self.node_to_array(node.nw,cells,y,x); self.node_to_array(node.ne,cells,y,x+half)
+        self.node_to_array(node.sw,cells,y+half,x); self.node_to_array(node.se,cells,y+half,x+half)
+        return cells
+
+    def set_cell(self,node,y,x,alive):
+        if node.level == 0: return self.alive_leaf if alive else self.dead_leaf
+        half = 1 << (node.level-1)
+        nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+        if y < half:
+            if x < half: nw = self.set_cell(nw,y,x,alive)
+            else: ne = self.set_cell(ne,y,x-half,alive)
+        else:
+            if x < half: sw = self.set_cell(sw,y-half,x,alive)
+            else: se = self.set_cell(se,y-half,x-half,alive)
+        return self.join(nw,ne,sw,se)
+
+    def get_cells(self):
+        return self.node_to_array(self.root)[:self.side,:self.side]
+
+    #
+    # Class methods
+    #
+    def initial_configuration(self,space,alive_cells,rule):
+        start_time = time.time()
+        # The nodes only have dead and alive leaves, the rules with dying states don't fit
+        if len(rule) > 2: raise ValueError('The hashlife backend only supports rules of 2 states')
+        # The memoized results are only valid for the rule they were computed with
+        self.rule = rule
+        self.clear_nodes()
+        root_side = 1 << (self.window_level-1)
+        cells = zeros((root_side,root_side),ubyte)
+        cells[:self.side,:self.side] = space[1:-1,1:-1]
+        self.root = self.array_to_node(cells,self.window_level-1)
+        end_time = time.time()
+        print('<--- Initial configuration update ({:.6f}s) --->'.format(end_time-start_time))
+
+    def clear(self):
+        self.root = self.empty(self.window_level-1)
+
+    def change_cell(self,index,alive:bool):
+        # The index comes from the padded space as (column, row)
+        x, y = index[0]-1, index[1]-1
+        self.root = self.set_cell(self.root,y,x,alive)
+
+    def next_generation(self,exponent:int=0):
+        start_time = time.time()
+        old_cells = self.get_cells()
+        # Jumps greater than the space allows get done in several jumps of the maximum size
+        if exponent > self.max_exponent:
+            for i in range(1 << (exponent-self.max_exponent)): self.jump(self.max_exponent)
+        else: self.jump(exponent)
+        # The changes get returned as the flat indexes of the valid cells that changed
+        changed_cells = flatnonzero(old_cells != self.get_cells())
+        end_time = time.time()
+        print('<--- Next 2^{} generations ({:.6f}s, {} nodes) --->'.format(exponent,end_time-start_time,len(self.nodes)))
+        return changed_cells
+
+    #
+    # Getters and setters
+    #
+    def get_alive_cells(self):
+        return self.root.population
+
+    def get_space(self):
+        # Conversion to the padded space with the toroidal padding applied
+        space = zeros((self.dimensions[0]+2,self.dimensions[1]+2),ubyte)
+        space[1:-1,1:-1] = self.get_cells()
+        space[0] = space[-2]; space[-1] = space[1]
+        space[:,0] = space[:,-2]; space[:,-1] = space[:,1]
+        return space
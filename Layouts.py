@@ -21,6 +21,13 @@ class Grid():
     
     locale_elements(self,list_elements) :
         Locates the elements provided in the grid from left to right, and top to bottom
+
+    get_pixel_elements(self,start,span) : (pixel_columns, pixel_rows)
+        Column of each pixel along the width and row of each pixel along the height,
+        -1 for the pixels of the padding, when the grid shows span elements from start
+
+    get_element_index(self,position) : (column, row)
+        Column and row of the element at a position of the window, None outside the grid
     """
 
     def __init__(self, window, size:tuple, coord:tuple=(0,0), num_cols:int=2, num_rows:int=2, padding:int=5):
@@ -54,6 +61,24 @@ class Grid():
                 x_pos += self.padding+self.element_size[0] # The next element must be placed in the x position with added padding and width of the previous element
             y_pos += self.padding+self.element_size[1] # The next row of elements must be placed in the y position with added padding and width of the previous elements
 
+    def get_pixel_elements(self,start:tuple=(0,0),span:tuple=None):
+        # The start (column, row) and span (columns, rows) can be fractions of element when zoomed
+        if span == None: span = (self.num_cols,self.num_rows)
+        return self.calculate_pixel_elements(int(self.size[0]),start[0],span[0]), self.calculate_pixel_elements(int(self.size[1]),start[1],span[1])
+
+    def calculate_pixel_elements(self,length,start,span):
+        # Every element takes the same fraction of the length, even below 1 pixel, with
+        # the padding at the start of its fraction while the elements are wide enough for it
+        position = start + np.arange(length)*span/length
+        elements = position.astype(np.intp)
+        if length/span > 2*self.padding: elements[(position-elements)*length/span < self.padding] = -1
+        return elements
+
+    def get_element_index(self,position):
+        x = position[0]-self.coord[0]; y = position[1]-self.coord[1]
+        if x < 0 or y < 0 or x >= self.size[0] or y >= self.size[1]: return None
+        return int(x*self.num_cols//int(self.size[0])), int(y*self.num_rows//int(self.size[1]))
+
 
 class SideBar():
     """Simple rectangle used as side bar
@@ -80,6 +105,13 @@ class SideBar():
     SAVE_BUTTON = 10
     UPLOAD_BUTTON = 11
     GLIDER_BUTTON = 12
+    ZOOM_IN_BUTTON = 13
+    ZOOM_OUT_BUTTON = 14
+    FOCUS_BUTTON = 15
+    SPEED_INPUT = 16
+    TURBO_INPUT = 17
+    # Targets of generations by second the speed input goes through
+    SPEED_TARGETS = [1,5,10,30,60,120,250,500,1000,2500,5000]
 
     def __init__(self,color_background:tuple,width:int=250,bottom_margin:int=0):
         # The only instance is the first created in the main
@@ -105,9 +137,14 @@ class SideBar():
         self.plot_section = Section(self.rectangle.x,180,self.rectangle.width,self.padding,'PLOTTING')
         self.colors_section = Section(self.rectangle.x,285+self.padding,self.rectangle.width,self.padding,'COLORS')
         self.structures_section = Section(self.rectangle.x,390+self.padding,self.rectangle.width,self.padding,'STRUCTURES')
+        self.speed_section = Section(self.rectangle.x,495+2*self.padding,self.rectangle.width,self.padding,'SPEED')
         self.graphical_elements.append(self.plot_section)
         self.graphical_elements.append(self.colors_section)
         self.graphical_elements.append(self.structures_section)
+        self.graphical_elements.append(self.speed_section)
+        # Target of generations by second, without limit in turbo mode
+        self.speed_target = 60
+        self.turbo = False
         # Graphical sprites inside the bar
         self.graphical_sprites = pygame.sprite.Group()
         self.graphical_sprites.add(self.set_play_button())
@@ -123,6 +160,11 @@ class SideBar():
         self.graphical_sprites.add(self.set_save_button())
         self.graphical_sprites.add(self.set_upload_button())
         self.graphical_sprites.add(self.set_glider_button())
+        self.graphical_sprites.add(self.set_zoom_in_button())
+        self.graphical_sprites.add(self.set_zoom_out_button())
+        self.graphical_sprites.add(self.set_focus_button())
+        self.graphical_sprites.add(self.set_speed_input())
+        self.graphical_sprites.add(self.set_turbo_input())
 
 
     def set_click_function(self,button,function):
@@ -247,6 +289,47 @@ class SideBar():
         
         return CircularButton(x,y,radius,image_size,border=False,image_path='./images/glider_w.png')
 
+    def set_zoom_in_button(self):
+        # Size of the button
+        radius = 18
+        image_size = 18
+        x = self.rectangle.x + self.padding
+        y = self.rectangle.height - 2*radius - 2*self.padding
+
+        return CircularButton(x,y,radius,image_size,border=False,image_path='./images/zoom_in.png')
+
+    def set_zoom_out_button(self):
+        # Size of the button
+        radius = 18
+        image_size = 18
+        x = self.rectangle.x + self.padding + 2*radius + 8
+        y = self.rectangle.height - 2*radius - 2*self.padding
+
+        return CircularButton(x,y,radius,image_size,border=False,image_path='./images/zoom_out.png')
+
+    def set_focus_button(self):
+        # Size of the button
+        radius = 18
+        image_size = 18
+        x = self.rectangle.x + self.padding + 4*radius + 16
+        y = self.rectangle.height - 2*radius - 2*self.padding
+
+        return CircularButton(x,y,radius,image_size,border=False,image_path='./images/focus.png')
+
+    def set_speed_input(self):
+        x = self.rectangle.x + self.padding + 5
+        y = self.speed_section.header_rect.y + 30 + self.padding
+        input = Input(x,y,45,label='Gen/s',width=FONT.size('Gen/s')[0]+70,allow_focus=False,value=str(self.speed_target))
+        input.set_click_function(self.change_speed_target)
+        return input
+
+    def set_turbo_input(self):
+        x = self.rectangle.x + 2*self.padding + 5 + 115
+        y = self.speed_section.header_rect.y + 30 + self.padding
+        input = Input(x,y,45,label='Turbo',width=FONT.size('Turbo')[0]+50,allow_focus=False,value='Off')
+        input.set_click_function(self.change_turbo)
+        return input
+
     # Functions when colors of cells clicked
     def change_dead_cell_color(self):
         input = self.graphical_sprites.sprites()[SideBar.DEAD_COLOR_INPUT]
@@ -254,7 +337,6 @@ class SideBar():
         new_color = COLORS_LIST[index_color_actual+1 if index_color_actual < len(COLORS_LIST)-1 else 0] 
         grph.GameGraphics.cells_colors[0] = new_color
         input.background_color = new_color
-        grph.GameGraphics.game_graphics.group_cells.update()
     
     def change_alive_cell_color(self):
         input = self.graphical_sprites.sprites()[SideBar.ALIVE_COLOR_INPUT]
@@ -262,7 +344,23 @@ class SideBar():
         new_color = COLORS_LIST[index_color_actual+1 if index_color_actual < len(COLORS_LIST)-1 else 0] 
         grph.GameGraphics.cells_colors[1] = new_color
         input.background_color = new_color
-        grph.GameGraphics.game_graphics.group_cells.update()
+
+    # Functions when speed controls clicked
+    def change_speed_target(self):
+        index_target_actual = SideBar.SPEED_TARGETS.index(self.speed_target) if self.speed_target in SideBar.SPEED_TARGETS else -1
+        self.set_speed(SideBar.SPEED_TARGETS[index_target_actual+1 if index_target_actual < len(SideBar.SPEED_TARGETS)-1 else 0],self.turbo)
+
+    def change_turbo(self):
+        self.set_speed(self.speed_target,not self.turbo)
+
+    def set_speed(self,speed_target,turbo:bool):
+        self.speed_target = speed_target
+        self.turbo = turbo
+        speed_input = self.graphical_sprites.sprites()[SideBar.SPEED_INPUT]
+        speed_input.value = str(speed_target); speed_input.value_text.update(speed_input.value)
+        turbo_input = self.graphical_sprites.sprites()[SideBar.TURBO_INPUT]
+        turbo_input.value = 'On' if turbo else 'Off'; turbo_input.value_text.update(turbo_input.value)
+        turbo_input.background_color = GREEN if turbo else LIGHT_BLACK_1
 
     def move_drag_button(self,x):
         self.slider.move_drag_button(x)
@@ -279,6 +377,9 @@ class SideBar():
         # Inputs cells colors
         self.graphical_sprites.sprites()[SideBar.DEAD_COLOR_INPUT].draw(window)
         self.graphical_sprites.sprites()[SideBar.ALIVE_COLOR_INPUT].draw(window)
+        # Inputs of the speed
+        self.graphical_sprites.sprites()[SideBar.SPEED_INPUT].draw(window)
+        self.graphical_sprites.sprites()[SideBar.TURBO_INPUT].draw(window)
 
     def get_graphical_sprites(self):
         return self.graphical_sprites
@@ -312,9 +413,11 @@ class BottomBar():
         # Creation of texts
         self.texts = []
         self.generations_text = Text((10,3+self.rectangle.y),'Generations:')
+        self.speed_text = Text((30+FONT.size('Generations:0000000')[0],3+self.rectangle.y),'Gen/s: 0.0')
         self.alive_cells_text = Text((self.rectangle.width-30-FONT.size('Alive Cells: 0')[0], 3+self.rectangle.y),'Alive Cells: 0')
         self.space_dimension_zoom_text = Text((self.rectangle.width/2-FONT.size('100x100(1.0)')[0], 3+self.rectangle.y),'100x100(1.0)')
         self.texts.append(self.generations_text)
+        self.texts.append(self.speed_text)
         self.texts.append(self.alive_cells_text)
         self.texts.append(self.space_dimension_zoom_text)
         
@@ -327,6 +430,9 @@ class BottomBar():
     def update_generations(self,generations):
         self.generations_text.update('Generations:'+str(generations))
 
+    def update_speed(self,speed):
+        self.speed_text.update('Gen/s: {:.1f}'.format(speed))
+
     def update_alive_cells(self,alive_cells):
         self.alive_cells_text.update('Alive Cells: '+str(alive_cells))
 
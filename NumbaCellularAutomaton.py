@@ -0,0 +1,359 @@
+import time
+from numpy import *
+from numba import njit, prange, get_num_threads
+from Constant import MATRIX_BIN_TO_DEC, BOUNDARY_TOROIDAL, BOUNDARIES, KERNEL_BOUNDARY_DEAD, KERNEL_BOUNDARY_REFLECTIVE, KERNEL_BOUNDARY_KLEIN
+from CPUCellularAutomaton import cpu_tiles_to_compute, cpu_boundary_padding, INCREMENTAL_CHANGES_FRACTION
+
+#
+#   JIT compiled CPU functions, with the same structure as the CUDA kernels
+#
+@njit(cache=True)
+def numba_neighbourhood_number(space,conversion_matrix,y,x):
+    # Conversion of the neighbourhood into a decimal number to be identified, only the
+    # alive cells (state 1) count
+    neighbourhood_number = 0
+    for y_nn in range(3):
+        for x_nn in range(3):
+            if space[y+y_nn,x+x_nn] == 1: neighbourhood_number += conversion_matrix[y_nn,x_nn]
+    return neighbourhood_number
+
+@njit(cache=True)
+def numba_compute_cell(space,out_space,changes_space,rule,neighbourhood_number,y,x):
+    # The state of the cell and the code of the 3x3 neighbourhood index the table of the rule
+    anchor_cell = space[y+1,x+1]
+    new_cell_value = rule[anchor_cell,neighbourhood_number]
+    out_space[y+1,x+1] = new_cell_value
+    changes_space[y+1,x+1] = 1 if new_cell_value != anchor_cell else 0
+    return new_cell_value
+
+@njit(cache=True)
+def numba_boundary_source(y,x,rows,columns,boundary):
+    # Valid cell copied by the cell at (y,x) in coordinates of the valid cells, which can be
+    # up to 1 cell out of the space, or (-1,-1) when it's out of a dead boundary
+    out_y = y < 0 or y >= rows; out_x = x < 0 or x >= columns
+    if not out_y and not out_x: return y, x
+    if boundary == KERNEL_BOUNDARY_DEAD: return -1, -1
+    if boundary == KERNEL_BOUNDARY_REFLECTIVE:
+        if y < 0: y = 0
+        elif y >= rows: y = rows-1
+        if x < 0: x = 0
+        elif x >= columns: x = columns-1
+        return y, x
+    x = x % columns
+    # The Klein bottle reverses the columns when crossing the top and bottom
+    if boundary == KERNEL_BOUNDARY_KLEIN and out_y: x = columns-1-x
+    return y % rows, x
+
+@njit(cache=True)
+def numba_mirror_padding(space,y,x,value,boundary):
+    # Copies the value of a valid cell at the borders into the padding cells that copy it, which
+    # are in its rows and columns of the padding or, for the Klein bottle, in its reversed column
+    rows = space.shape[0]-2; columns = space.shape[1]-2
+    if y != 0 and y != rows-1 and x != 0 and x != columns-1: return
+    for i in range(3):
+        padding_y = y if i == 0 else (-1 if i == 1 else rows)
+        for j in range(4):
+            padding_x = x if j == 0 else (-1 if j == 1 else (columns if j == 2 else columns-1-x))
+            if padding_y >= 0 and padding_y < rows and padding_x >= 0 and padding_x < columns: continue
+            source_y, source_x = numba_boundary_source(padding_y,padding_x,rows,columns,boundary)
+            if source_y == y and source_x == x: space[padding_y+1,padding_x+1] = value
+
+@njit(cache=True)
+def numba_border_padding(space,boundary):
+    # Only the cells of the borders get copied into the padding
+    rows = space.shape[0]-2; columns = space.shape[1]-2
+    for x in range(columns):
+        numba_mirror_padding(space,0,x,space[1,x+1],boundary)
+        numba_mirror_padding(space,rows-1,x,space[rows,x+1],boundary)
+    for y in range(1,rows-1):
+        numba_mirror_padding(space,y,0,space[y+1,1],boundary)
+        numba_mirror_padding(space,y,columns-1,space[y+1,columns],boundary)
+
+@njit(parallel=True,cache=True)
+def numba_next_generation(space,out_space,changes_space,rule,conversion_matrix,chunks_frecuency,count_frecuency,boundary):
+    # The alive cells are counted by a reduction of the chunks of rows, without atomics. The
+    # code of each neighbourhood gives the new state and, when counted, goes to the histogram
+    # of its chunk, so the histogram of the generation needs no other pass
+    # The cells of the borders also write the padding of the new space after the loop, so
+    # it's ready to be swapped with the actual one without any copy
+    rows = space.shape[0]-2; columns = space.shape[1]-2
+    number_chunks = chunks_frecuency.shape[0]
+    alive_cells = 0
+    for chunk in prange(number_chunks):
+        for y in range(chunk*rows//number_chunks,(chunk+1)*rows//number_chunks):
+            for x in range(columns):
+                neighbourhood_number = numba_neighbourhood_number(space,conversion_matrix,y,x)
+                if count_frecuency: chunks_frecuency[chunk,neighbourhood_number] += 1
+                if numba_compute_cell(space,out_space,changes_space,rule,neighbourhood_number,y,x) == 1: alive_cells += 1
+    numba_border_padding(out_space,boundary)
+    return alive_cells
+
+@njit(parallel=True,cache=True)
+def numba_count_alive_cells(space):
+    alive_cells = 0
+    for y in prange(1,space.shape[0]-1):
+        for x in range(1,space.shape[1]-1):
+            if space[y,x] == 1: alive_cells += 1
+    return alive_cells
+
+@njit(cache=True)
+def numba_tile_limits(space,tile_y,tile_x,tile_size):
+    # The last tiles get clipped by the padding of the space
+    end_y = tile_y*tile_size + tile_size; end_x = tile_x*tile_size + tile_size
+    if end_y > space.shape[0]-2: end_y = space.shape[0]-2
+    if end_x > space.shape[1]-2: end_x = space.shape[1]-2
+    return end_y, end_x
+
+@njit(parallel=True,cache=True)
+def numba_next_generation_tiles(space,out_space,changes_space,rule,conversion_matrix,tiles,tile_size,changed_tiles):
+    # Each tile listed is an iteration, the difference of alive cells is a reduction. The
+    # changed cells of every tile get counted in its position of the changed tiles
+    added_cells = 0
+    for i in prange(tiles.shape[0]):
+        tile_y = tiles[i,0]; tile_x = tiles[i,1]
+        end_y, end_x = numba_tile_limits(space,tile_y,tile_x,tile_size)
+        for y in range(tile_y*tile_size,end_y):
+            for x in range(tile_x*tile_size,end_x):
+                anchor_cell = space[y+1,x+1]
+                neighbourhood_number = numba_neighbourhood_number(space,conversion_matrix,y,x)
+                new_cell_value = numba_compute_cell(space,out_space,changes_space,rule,neighbourhood_number,y,x)
+                if new_cell_value != anchor_cell:
+                    changed_tiles[tile_y,tile_x] += 1
+                    added_cells += int64(new_cell_value == 1) - int64(anchor_cell == 1)
+    return added_cells
+
+@njit(parallel=True,cache=True)
+def numba_update_results_tiles(space,out_space,tiles,tile_size,boundary):
+    for i in prange(tiles.shape[0]):
+        tile_y = tiles[i,0]; tile_x = tiles[i,1]
+        end_y, end_x = numba_tile_limits(space,tile_y,tile_x,tile_size)
+        for y in range(tile_y*tile_size,end_y):
+            for x in range(tile_x*tile_size,end_x):
+                space[y+1,x+1] = out_space[y+1,x+1]
+                # The padding only gets updated for the cells of the computed tiles
+                numba_mirror_padding(space,y,x,space[y+1,x+1],boundary)
+
+@njit(parallel=True,cache=True)
+def numba_tiles_changes(changes_space,tiles,offsets,tile_size,changed_cells):
+    # The flat indexes of the changed cells of each tile listed go from its offset
+    # of the list, so only the tiles that changed get scanned
+    columns = changes_space.shape[1]-2
+    for i in prange(tiles.shape[0]):
+        tile_y = tiles[i,0]; tile_x = tiles[i,1]
+        end_y, end_x = numba_tile_limits(changes_space,tile_y,tile_x,tile_size)
+        position = offsets[i]
+        for y in range(tile_y*tile_size,end_y):
+            for x in range(tile_x*tile_size,end_x):
+                if changes_space[y+1,x+1]:
+                    changed_cells[position] = y*columns + x
+                    position += 1
+
+@njit(parallel=True,cache=True)
+def numba_shannons_probability(space,conversion_matrix,number_chunks):
+    rows = space.shape[0]-2; columns = space.shape[1]-2
+    # Every chunk of rows keeps its own histogram, summed at the end instead of atomics
+    chunks_frecuency = zeros((number_chunks,512),int64)
+    for chunk in prange(number_chunks):
+        for y in range(chunk*rows//number_chunks,(chunk+1)*rows//number_chunks):
+            for x in range(columns):
+                chunks_frecuency[chunk,numba_neighbourhood_number(space,conversion_matrix,y,x)] += 1
+    return chunks_frecuency.sum(axis=0)
+
+@njit(parallel=True,cache=True)
+def numba_neighbourhood_codes(space,conversion_matrix,codes):
+    for y in prange(space.shape[0]-2):
+        for x in range(space.shape[1]-2):
+            codes[y,x] = numba_neighbourhood_number(space,conversion_matrix,y,x)
+
+@njit(cache=True)
+def numba_update_neighbourhood_frecuency(space,changed_cells,conversion_matrix,codes,neighbourhood_frecuency,boundary):
+    # Only the neighbourhoods around the changed cells (flat indexes) and their copies in the
+    # padding get converted again, the ones shared by several changes get compared with their
+    # code so they count once
+    rows = space.shape[0]-2; columns = space.shape[1]-2
+    for changed_cell in changed_cells:
+        y = changed_cell // columns; x = changed_cell % columns
+        for i in range(3):
+            copy_y = y if i == 0 else (-1 if i == 1 else rows)
+            for j in range(4):
+                copy_x = x if j == 0 else (-1 if j == 1 else (columns if j == 2 else columns-1-x))
+                source_y, source_x = numba_boundary_source(copy_y,copy_x,rows,columns,boundary)
+                if source_y != y or source_x != x: continue
+                for y_nn in range(copy_y-1,copy_y+2):
+                    for x_nn in range(copy_x-1,copy_x+2):
+                        if y_nn < 0 or y_nn >= rows or x_nn < 0 or x_nn >= columns: continue
+                        neighbourhood_number = numba_neighbourhood_number(space,conversion_matrix,y_nn,x_nn)
+                        if neighbourhood_number != codes[y_nn,x_nn]:
+                            neighbourhood_frecuency[codes[y_nn,x_nn]] -= 1
+                            neighbourhood_frecuency[neighbourhood_number] += 1
+                            codes[y_nn,x_nn] = neighbourhood_number
+
+@njit(cache=True)
+def numba_change_cell(position,space,boundary,value):
+    # The cell takes the value given, alive (1) or dead (0), returns the difference of alive cells
+    old_cell_value = space[position[1],position[0]]
+    space[position[1],position[0]] = value
+    numba_mirror_padding(space,position[1]-1,position[0]-1,space[position[1],position[0]],boundary)
+    return (1 if value == 1 else 0) - (1 if old_cell_value == 1 else 0)
+
+
+class NumbaCellularAutomaton():
+    """Backend for the hosts without GPU, the kernels of the CUDACellularAutomaton
+    compiled for the CPU with numba and run in parallel over the rows of the space.
+    Shares the interface of the CUDACellularAutomaton so it can be used in its place
+    """
+
+    def __init__(self,space,dimensions,tile_size:int=0,incremental_entropy:bool=False,boundary:str=BOUNDARY_TOROIDAL):
+        # Number of valid cells by side
+        self.dimensions = (dimensions[0],dimensions[1])
+        self.alive_cells = 0
+        # The kernels receive the boundary by its index
+        self.boundary = boundary
+        self.kernel_boundary = BOUNDARIES.index(boundary)
+        # When the tiles are used, only the tiles that changed in the last
+        # generation and their neighbours get computed
+        self.tile_size = tile_size
+        self.active_tiles = None
+        self.changed_tiles = None # Number of cells changed by each tile in the last generation
+        self.last_changed_cells = None # List of the changed cells, once it's been collected
+        # When incremental, the codes of the neighbourhoods and their histogram are kept
+        # and updated every generation with the neighbourhoods around the changed cells
+        self.incremental_entropy = incremental_entropy
+        self.neighbourhood_codes = None
+        self.neighbourhood_frecuency = None
+
+        # Padded arrays equivalent to those in the memory of the GPU, without tiles the
+        # generations get computed from one into the other and then they're swapped
+        self.space_rule = None
+        self.space = zeros((self.dimensions[0]+2,self.dimensions[1]+2),ubyte)
+        self.out_space = zeros_like(self.space)
+        self.changes_space = zeros_like(self.space) # Used to indicate which cells have changed after the generation function
+        self.conversion_matrix = array(MATRIX_BIN_TO_DEC,int64)
+        # The threads of numba get started by the thread that creates the engine, the TBB
+        # layer hangs at the exit when they're started by the simulation thread
+        self.alive_cells = numba_count_alive_cells(self.space)
+
+    #
+    # Class methods
+    #
+    def initial_configuration(self,space,alive_cells,rule):
+        start_time = time.time()
+        self.space_rule = array(rule,ubyte)
+        self.space[:] = space
+        cpu_boundary_padding(self.space,self.boundary)
+        # Both spaces start with the padding, the dead boundary never writes it again
+        self.out_space[:] = self.space
+        self.changes_space[:] = 0
+        self.alive_cells = numba_count_alive_cells(self.space)
+        self.neighbourhood_codes = None
+        self.activate_tiles()
+        end_time = time.time()
+        print('<--- Initial configuration update ({:.6f}s) --->'.format(end_time-start_time))
+
+    def clear(self):
+        self.space[:] = 0
+        self.out_space[:] = 0
+        self.alive_cells = 0
+        self.neighbourhood_codes = None
+        self.activate_tiles()
+
+    def activate_tiles(self,index=None):
+        if not self.tile_size: return
+        # Without index all the tiles get computed in the next generation
+        if index is None:
+            number_tiles = (self.dimensions[0] + self.tile_size-1) // self.tile_size
+            self.active_tiles = ones((number_tiles,number_tiles),bool_)
+        else: self.active_tiles[(index[1]-1)//self.tile_size,(index[0]-1)//self.tile_size] = True
+
+    def change_cell(self,index,alive:bool):
+        self.alive_cells += numba_change_cell(array(index,int64),self.space,self.kernel_boundary,int(alive))
+        self.activate_tiles(index)
+        self.neighbourhood_codes = None
+
+    def next_generation(self):
+        start_time = time.time()
+        self.step()
+        changed_cells = self.changed_cells()
+        end_time = time.time()
+        print('<--- Next generation ({:.6f}s) --->'.format(end_time-start_time))
+        return changed_cells
+
+    def changed_cells(self):
+        # Flat indexes of the valid cells that changed, with tiles only the ones that changed get scanned
+        if self.last_changed_cells is not None: return self.last_changed_cells
+        if not self.tile_size: self.last_changed_cells = flatnonzero(self.changes_space[1:-1,1:-1])
+        else:
+            tiles = argwhere(self.changed_tiles)
+            counts = self.changed_tiles[tiles[:,0],tiles[:,1]]
+            self.last_changed_cells = zeros(int(counts.sum()),int64)
+            if len(tiles): numba_tiles_changes(self.changes_space,tiles,cumsum(counts)-counts,self.tile_size,self.last_changed_cells)
+        return self.last_changed_cells
+
+    def next_generations(self,generations:int,shannon_entropy:bool=False,changed_cells:bool=False):
+        # Same batch as the CUDA engine, the alive cells and the histograms of the
+        # neighbourhoods before each generation get returned at the end, and the
+        # cells that changed through the whole batch when asked
+        start_time = time.time()
+        space_before = self.space[1:-1,1:-1].copy() if changed_cells else None
+        alive_cells_record = zeros(generations,int64)
+        neighbourhood_frecuency_record = zeros((generations,512),int64) if shannon_entropy else None
+        # Without tiles the histogram comes from the same codes that give the new states, the
+        # incremental codes aren't updated meanwhile and get computed again when needed
+        step_entropy = shannon_entropy and not self.tile_size
+        if step_entropy: self.neighbourhood_codes = None
+        for generation in range(generations):
+            alive_cells_record[generation] = self.alive_cells
+            if step_entropy: neighbourhood_frecuency_record[generation] = self.step(True)
+            else:
+                if shannon_entropy: neighbourhood_frecuency_record[generation] = self.shannon_entropy()
+                self.step()
+        changed_cells = flatnonzero(space_before != self.space[1:-1,1:-1]) if changed_cells else None
+        end_time = time.time()
+        print('<--- {} generations ({:.6f}s) --->'.format(generations,end_time-start_time))
+        return alive_cells_record, neighbourhood_frecuency_record, changed_cells
+
+    def step(self,count_frecuency:bool=False):
+        # Returns the histogram of the neighbourhoods before the generation when counted
+        chunks_frecuency = None
+        self.last_changed_cells = None
+        if self.tile_size:
+            tiles = argwhere(cpu_tiles_to_compute(self.active_tiles,self.boundary)).astype(int64)
+            self.changed_tiles = zeros(self.active_tiles.shape,int64)
+            self.alive_cells += numba_next_generation_tiles(self.space,self.out_space,self.changes_space,self.space_rule,self.conversion_matrix,tiles,self.tile_size,self.changed_tiles)
+            numba_update_results_tiles(self.space,self.out_space,tiles,self.tile_size,self.kernel_boundary)
+            self.active_tiles = self.changed_tiles != 0
+        else:
+            chunks_frecuency = zeros((get_num_threads(),512),int64)
+            self.alive_cells = numba_next_generation(self.space,self.out_space,self.changes_space,self.space_rule,self.conversion_matrix,chunks_frecuency,count_frecuency,self.kernel_boundary)
+            self.space, self.out_space = self.out_space, self.space
+        if self.neighbourhood_codes is not None:
+            changed_cells = self.changed_cells()
+            # With many changes all the codes get computed again in parallel
+            if len(changed_cells) > self.neighbourhood_codes.size*INCREMENTAL_CHANGES_FRACTION: self.compute_neighbourhood_codes()
+            else: numba_update_neighbourhood_frecuency(self.space,changed_cells,self.conversion_matrix,self.neighbourhood_codes,self.neighbourhood_frecuency,self.kernel_boundary)
+        return chunks_frecuency.sum(axis=0) if count_frecuency else None
+
+    def shannon_entropy(self):
+        if not self.incremental_entropy: return numba_shannons_probability(self.space,self.conversion_matrix,get_num_threads())
+        # The codes get computed once, after that the histogram follows the generations
+        if self.neighbourhood_codes is None:
+            self.neighbourhood_codes = zeros(self.dimensions,int64)
+            self.compute_neighbourhood_codes()
+        return copy(self.neighbourhood_frecuency)
+
+    def compute_neighbourhood_codes(self):
+        numba_neighbourhood_codes(self.space,self.conversion_matrix,self.neighbourhood_codes)
+        self.neighbourhood_frecuency = bincount(self.neighbourhood_codes.ravel(),minlength=512)
+
+    #
+    # Getters and setters
+    #
+    def get_alive_cells(self):
+        return self.alive_cells
+
+    def get_space(self):
+        return copy(self.space)
+
+    def get_cells_states(self,changed_cells):
+        # States of the cells given by their flat indexes, without copying the space
+        return self.space[changed_cells//self.dimensions[1]+1,changed_cells%self.dimensions[1]+1]
@@ -0,0 +1,112 @@
+import time
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from numpy import *
+from Constant import BOUNDARY_TOROIDAL
+from CPUCellularAutomaton import cpu_next_generation, cpu_boundary_padding, cpu_mirror_padding
+
+# Planes of the shared space attached by every worker process
+worker_shared_memory = None
+worker_planes = None
+
+#
+#   Worker functions
+#
+def parallel_attach(shared_memory_name, shape):
+    global worker_shared_memory, worker_planes
+    worker_shared_memory = SharedMemory(name=shared_memory_name)
+    worker_planes = ndarray(shape,ubyte,buffer=worker_shared_memory.buf)
+
+def parallel_next_band(task):
+    # The band reads its rows plus the one row halo above and below from the
+    # actual plane, and writes the new rows in the other plane
+    actual_plane, start_row, end_row, rule = task
+    space = worker_planes[actual_plane]
+    new_cells, alive_cells, changes_space = cpu_next_generation(space[start_row:end_row+2],rule)
+    worker_planes[1-actual_plane,start_row+1:end_row+1,1:-1] = new_cells
+    # Only the compact list of changed cells goes back to the main process
+    return alive_cells, flatnonzero(changes_space) + start_row*changes_space.shape[1]
+
+
+class ParallelCellularAutomaton():
+    """Backend that splits the space in horizontal bands computed by a pool of processes,
+    sharing the interface of the CUDACellularAutomaton so it can be used in its place
+
+    The 2 planes of the padded space (actual and next generation) live in shared memory,
+    so the workers read the rows of the neighbour bands as halos and nothing but the
+    band limits and the changed cells gets pickled every generation
+    """
+
+    def __init__(self,space,dimensions,workers:int=2,boundary:str=BOUNDARY_TOROIDAL):
+        # Number of valid cells by side
+        self.dimensions = (dimensions[0],dimensions[1])
+        self.workers = workers
+        self.boundary = boundary
+        self.rule = None
+        self.alive_cells = 0
+        # Both planes of the padded space in shared memory
+        shape = (2,self.dimensions[0]+2,self.dimensions[1]+2)
+        self.shared_memory = SharedMemory(create=True,size=int(prod(shape)))
+        self.planes = ndarray(shape,ubyte,buffer=self.shared_memory.buf)
+        self.planes[:] = 0
+        self.actual_plane = 0
+        # Bands of rows of the valid cells, one by worker
+        limits = linspace(0,self.dimensions[0],workers+1).astype(int)
+        self.bands = [(int(limits[i]),int(limits[i+1])) for i in range(workers) if limits[i] < limits[i+1]]
+        # The workers don't get forked from this process, which can already have the threads
+        # of numba started, and a fork only copies the thread that calls it
+        self.pool = get_context('forkserver').Pool(workers,initializer=parallel_attach,initargs=(self.shared_memory.name,shape))
+
+    #
+    # Class methods
+    #
+    def initial_configuration(self,space,alive_cells,rule):
+        self.planes[self.actual_plane] = space
+        cpu_boundary_padding(self.planes[self.actual_plane],self.boundary)
+        self.alive_cells = int(count_nonzero(self.planes[self.actual_plane,1:-1,1:-1] == 1))
+        self.rule = rule
+
+    def clear(self):
+        self.planes[:] = 0
+        self.alive_cells = 0
+
+    def change_cell(self,index,alive:bool):
+        space = self.planes[self.actual_plane]
+        # The cell takes the state given, alive (1) or dead (0)
+        old_cell_value = space[index[1],index[0]]
+        space[index[1],index[0]] = int(alive)
+        self.alive_cells += int(space[index[1],index[0]] == 1) - int(old_cell_value == 1)
+        cpu_mirror_padding(space,index[1]-1,index[0]-1,self.boundary)
+
+    def next_generation(self):
+        start_time = time.time()
+        tasks = [(self.actual_plane,start_row,end_row,self.rule) for start_row, end_row in self.bands]
+        results = self.pool.map(parallel_next_band,tasks)
+        # The new plane becomes the actual one with the padding of its boundary
+        self.actual_plane = 1-self.actual_plane
+        cpu_boundary_padding(self.planes[self.actual_plane],self.boundary)
+        self.alive_cells = sum([alive_cells for alive_cells, changed_cells in results])
+        changed_cells = concatenate([changed_cells for alive_cells, changed_cells in results])
+        end_time = time.time()
+        print('<--- Next generation with {} workers ({:.6f}s) --->'.format(len(self.bands),end_time-start_time))
+        return changed_cells
+
+    def close(self):
+        # The pool and the shared memory must be released explicitly
+        self.pool.terminate()
+        self.planes = None
+        self.shared_memory.close()
+        self.shared_memory.unlink()
+
+    #
+    # Getters and setters
+    #
+    def get_alive_cells(self):
+        return self.alive_cells
+
+    def get_space(self):
+        return copy(self.planes[self.actual_plane])
+
+    def get_cells_states(self,changed_cells):
+        # States of the cells given by their flat indexes, without copying the space
+        return self.planes[self.actual_plane,changed_cells//self.dimensions[1]+1,changed_cells%self.dimensions[1]+1]
@@ -0,0 +1,114 @@
+import re
+import numpy as np
+
+# Patterns of the community in RLE (run length encoded) or plaintext .cells files,
+# streamed by chunks and decoded straight into the cells of the space
+RLE_HEADER = re.compile(rb'x\s*=\s*(\d+)\s*,\s*y\s*=\s*(\d+)(?:\s*,\s*rule\s*=\s*(\S+))?',re.IGNORECASE)
+RLE_CHUNK_SIZE = 1 << 20
+# Tags of the RLE files, any other letter is an alive state of a multistate pattern
+RLE_DEAD = b'b.'
+RLE_END_OF_LINE = ord('$')
+RLE_END = ord('!')
+# State of each tag: the multistate patterns use 'A' to 'X' for the states 1 to 24
+RLE_STATES = np.ones(256,np.ubyte)
+RLE_STATES[np.frombuffer(RLE_DEAD,np.ubyte)] = 0
+RLE_STATES[ord('A'):ord('X')+1] = np.arange(1,25)
+CELLS_ALIVE = b'O*'
+
+def read_pattern_header(filename:str) -> tuple:
+    # Rows, columns and rule (text, None if not given) of the pattern
+    if filename.endswith('.rle'):
+        with open(filename,'rb') as file:
+            for line in file:
+                if line.startswith(b'#') or not line.strip(): continue
+                header = RLE_HEADER.match(line.strip())
+                if header == None: raise ValueError('RLE file without header "x = m, y = n": "{}"'.format(filename))
+                return int(header.group(2)), int(header.group(1)), header.group(3).decode('ascii') if header.group(3) else None
+        raise ValueError('Empty RLE file: "{}"'.format(filename))
+    # The .cells files have no header, their size comes from the lines
+    rows = columns = 0
+    with open(filename,'rb') as file:
+        for line in file:
+            if line.startswith(b'!'): continue
+            rows += 1; columns = max(columns,len(line.rstrip()))
+    return rows, columns, None
+
+def decode_pattern(filename:str, cells, start:tuple=(0,0)) -> int:
+    # The alive cells of the pattern get set in cells with the top left corner of the
+    # pattern at start (row, column), the cells out of the array are skipped
+    # Returns the number of alive cells (state 1) set
+    if filename.endswith('.rle'): return decode_rle(filename,cells,start)
+    return decode_cells(filename,cells,start)
+
+def set_alive_runs(cells, rows, columns, lengths, states=None) -> int:
+    # Runs of alive cells (or of the states given) from each column to column+length in its
+    # row, clipped to the array
+    if states is None: states = np.ones(len(rows),np.ubyte)
+    first = np.maximum(columns,0); last = np.minimum(columns+lengths,cells.shape[1])
+    inside = (rows >= 0) & (rows < cells.shape[0]) & (first < last)
+    rows = rows[inside]; first = first[inside]; lengths = last[inside]-first; states = states[inside]
+    # Every run gets expanded to the columns of its cells
+    offsets = np.cumsum(lengths)-lengths
+    cells[np.repeat(rows,lengths),np.repeat(first-offsets,lengths)+np.arange(lengths.sum())] = np.repeat(states,lengths)
+    return int(lengths[states == 1].sum())
+
+def decode_rle_tokens(data, cells, row:int, column:int, start_column:int) -> tuple:
+    # The tokens are the tags with the count given by the digits before them (1 without digits)
+    digits = (data >= ord('0')) & (data <= ord('9'))
+    tags = np.flatnonzero(~digits)
+    digit_positions = np.flatnonzero(digits)
+    digit_tags = np.searchsorted(tags,digit_positions)
+    counts = np.bincount(digit_tags,(data[digit_positions]-ord('0'))*10.0**(tags[digit_tags]-digit_positions-1),len(tags)).astype(np.int64)
+    counts[np.bincount(digit_tags,minlength=len(tags)) == 0] = 1
+    tags = data[tags]
+
+    # Row of each token by the end of lines before it, and its column by the cells
+    # advanced since the last end of line
+    end_of_line = tags == RLE_END_OF_LINE
+    rows = row + np.cumsum(np.where(end_of_line,counts,0)) - np.where(end_of_line,counts,0)
+    advances = np.where(end_of_line,0,counts)
+    advanced = np.cumsum(advances)
+    last_end_of_line = np.maximum.accumulate(np.where(end_of_line,np.arange(len(tags)),-1))
+    columns = np.where(last_end_of_line >= 0,start_column+advanced-advanced[last_end_of_line],column+advanced) - advances
+
+    states = RLE_STATES[tags]
+    alive = ~end_of_line & (states != 0)
+    alive_cells = set_alive_runs(cells,rows[alive],columns[alive],counts[alive],states[alive])
+    if len(tags):
+        row = int(rows[-1] + (counts[-1] if end_of_line[-1] else 0))
+        column = int(start_column if end_of_line[-1] else columns[-1]+counts[-1])
+    return alive_cells, row, column
+
+def decode_rle(filename:str, cells, start:tuple=(0,0)) -> int:
+    row, column = start
+    alive_cells = 0
+    with open(filename,'rb') as file:
+        # The comments and the header go before the cells
+        for line in file:
+            if not line.startswith(b'#') and line.strip(): break
+        # Digits at the end of a chunk belong to the tag at the start of the next one
+        pending = np.array([],np.ubyte)
+        while True:
+            chunk = file.read(RLE_CHUNK_SIZE)
+            data = np.concatenate((pending,np.frombuffer(chunk,np.ubyte)))
+            data = data[data > ord(' ')]
+            end = np.flatnonzero(data == RLE_END)
+            if end.size: data = data[:end[0]]
+            # Only the complete tokens get decoded, up to the last tag
+            tag_positions = np.flatnonzero((data < ord('0')) | (data > ord('9')))
+            last_tag = tag_positions[-1]+1 if tag_positions.size else 0
+            added_cells, row, column = decode_rle_tokens(data[:last_tag],cells,row,column,start[1])
+            alive_cells += added_cells
+            pending = data[last_tag:]
+            if not chunk or end.size: return alive_cells
+
+def decode_cells(filename:str, cells, start:tuple=(0,0)) -> int:
+    row = start[0]
+    alive_cells = 0
+    with open(filename,'rb') as file:
+        for line in file:
+            if line.startswith(b'!'): continue
+            columns = np.flatnonzero(np.isin(np.frombuffer(line.rstrip(),np.ubyte),np.frombuffer(CELLS_ALIVE,np.ubyte)))
+            alive_cells += set_alive_runs(cells,np.full(len(columns),row),start[1]+columns,np.ones(len(columns),np.int64))
+            row += 1
+    return alive_cells
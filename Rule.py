@@ -0,0 +1,144 @@
+import re
+from numpy import *
+
+# Rules of the Life-like family (outer totalistic): the neighbours counts that make a
+# dead cell be born (B) and an alive cell survive (S). They can be given as:
+#   - B/S notation: "B3/S23", "B36/S23", "B3678/S34678"
+#   - S/B notation: "23/3"
+#   - The 4 limits (survive min, survive max, birth min, birth max): (2,3,3,3) or "2,3,3,3"
+# The isotropic non-totalistic rules use the Hensel notation, where a count can be followed
+# by the letters of the configurations of neighbours it includes ("B2a/S12") or, after a '-',
+# of those it excludes ("B3/S2-i34q")
+# The rules of the Generations family add the number of states C ("B2/S/C3", "345/2/4"), the
+# alive cells that don't survive pass through the states 2 to C-1 before dying and only the
+# alive cells (state 1) count as neighbours
+# Every rule gets compiled to a table of C rows of 512 entries, with the new state of the cell
+# at the row of its state and the code of its 3x3 neighbourhood of alive cells (the bits
+# weighted as in MATRIX_BIN_TO_DEC, 16 is the cell)
+RULE_TABLE_SIZE = 512
+ANCHOR_BIT = 16
+# The states are stored as uint8
+MAX_STATES = 256
+
+# Configuration of neighbours of each letter, as a code of the neighbourhood. The letters
+# classify the configurations of each count up to rotations and reflections, the counts
+# from 5 to 7 use the letters of the complementary configuration of 8-count neighbours
+HENSEL_NEIGHBOURHOODS = {
+    1: {'c': 1, 'e': 2},
+    2: {'c': 5, 'e': 10, 'k': 33, 'a': 3, 'i': 40, 'n': 68},
+    3: {'c': 69, 'e': 42, 'k': 98, 'a': 11, 'i': 7, 'n': 13, 'y': 97, 'q': 70, 'j': 14, 'r': 41},
+    4: {'c': 325, 'e': 170, 'k': 99, 'a': 15, 'i': 45, 'n': 71, 'y': 101, 'q': 102, 'j': 106, 'r': 43, 't': 105, 'w': 78, 'z': 108},
+}
+HENSEL_COUNTS = re.compile(r'(\d)(-?)([a-z]*)')
+
+def hensel_letters(count:int) -> str:
+    # Letters of the configurations of the count, none for 0 and 8 neighbours
+    return ''.join(HENSEL_NEIGHBOURHOODS.get(count if count <= 4 else 8-count,{}))
+
+def symmetric_codes(code:int) -> set:
+    # The code of the neighbourhood under the 4 rotations, with and without reflection
+    cells = (code >> arange(9)).reshape(3,3) & 1
+    weights = 1 << arange(9).reshape(3,3)
+    return {int((rot90(cells,turns)*weights).sum()) for turns in range(4)} | {int((rot90(cells,turns)[:,::-1]*weights).sum()) for turns in range(4)}
+
+def neighbourhood_classes() -> list:
+    # Count and letter of the neighbours of each code, the letter is '' for 0 and 8 neighbours
+    letters = {}
+    for count, configurations in HENSEL_NEIGHBOURHOODS.items():
+        for letter, code in configurations.items():
+            for symmetric_code in symmetric_codes(code): letters[symmetric_code] = letter
+    classes = []
+    for code in range(RULE_TABLE_SIZE):
+        neighbours = code & ~ANCHOR_BIT
+        count = bin(neighbours).count('1')
+        if count > 4: neighbours ^= (RULE_TABLE_SIZE-1) & ~ANCHOR_BIT
+        classes.append((count,letters.get(neighbours,'')))
+    return classes
+
+NEIGHBOURHOOD_CLASSES = neighbourhood_classes()
+# Number of alive neighbours of the anchor cell for each code
+NEIGHBOURS_BY_CODE = array([count for count, letter in NEIGHBOURHOOD_CLASSES],ubyte)
+
+def parse_counts(counts:str, rule) -> set:
+    # Configurations of the counts, as (count, letter) pairs
+    if not re.fullmatch(r'(\d-?[a-z]*)*',counts): raise ValueError('Invalid neighbours counts "{}" in the rule "{}"'.format(counts,rule))
+    configurations = set()
+    for count, exclude, letters in HENSEL_COUNTS.findall(counts):
+        count = int(count); valid_letters = hensel_letters(count)
+        if count > 8 or (exclude and not letters) or not set(letters) <= set(valid_letters):
+            raise ValueError('Invalid neighbours counts "{}" in the rule "{}"'.format(counts,rule))
+        if exclude: letters = ''.join(letter for letter in valid_letters if letter not in letters)
+        elif not letters: letters = valid_letters or ''
+        configurations |= {(count,letter) for letter in letters} if valid_letters else {(count,'')}
+    return configurations
+
+def rule_configurations(rule) -> tuple:
+    # Configurations of neighbours of birth and survival of the rule, and its number of states
+    # The suffix of the bounded grids (":T100,100") is ignored
+    if isinstance(rule,str): rule = rule.split(':')[0].strip()
+    if isinstance(rule,str) and ',' in rule: rule = tuple(int(limit) for limit in rule.split(','))
+    if not isinstance(rule,str):
+        if len(rule) != 4: raise ValueError('The rule must have 4 limits: "{}"'.format(rule))
+        rule = 'B{}/S{}'.format(''.join(str(count) for count in range(rule[2],rule[3]+1)),''.join(str(count) for count in range(rule[0],rule[1]+1)))
+    parts = rule.lower().split('/')
+    if len(parts) not in (2,3): raise ValueError('The rule must be in B/S notation: "{}"'.format(rule))
+    if parts[0].startswith('b') or parts[1].startswith('s'): birth, survive = parts[0][parts[0].startswith('b'):], parts[1][parts[1].startswith('s'):]
+    else: survive, birth = parts[:2]
+    states = 2
+    if len(parts) == 3:
+        states = parts[2][parts[2].startswith('c'):]
+        if not states.isdigit() or not 2 <= int(states) <= MAX_STATES: raise ValueError('Invalid number of states "{}" in the rule "{}"'.format(states,rule))
+        states = int(states)
+    return parse_counts(birth,rule), parse_counts(survive,rule), states
+
+def configurations_string(configurations:set) -> str:
+    # Each count with the letters included, or the letters excluded when they're less
+    text = ''
+    for count in range(9):
+        valid_letters = hensel_letters(count)
+        if not valid_letters:
+            if (count,'') in configurations: text += str(count)
+            continue
+        letters = ''.join(letter for letter in valid_letters if (count,letter) in configurations)
+        if not letters: continue
+        excluded = ''.join(letter for letter in valid_letters if letter not in letters)
+        if not excluded: text += str(count)
+        elif len(excluded) < len(letters): text += '{}-{}'.format(count,excluded)
+        else: text += '{}{}'.format(count,letters)
+    return text
+
+def rule_string(rule) -> str:
+    # The rule in B/S notation, with the number of states only when there are more than 2
+    birth, survive, states = rule_configurations(rule)
+    text = 'B{}/S{}'.format(configurations_string(birth),configurations_string(survive))
+    return text + '/C{}'.format(states) if states > 2 else text
+
+def compile_rule(rule):
+    birth, survive, states = rule_configurations(rule)
+    # Alive (1) or not by the code of the neighbourhood, with the anchor bit for the alive cells
+    alive_table = array([NEIGHBOURHOOD_CLASSES[code] in (survive if code & ANCHOR_BIT else birth) for code in range(RULE_TABLE_SIZE)],ubyte)
+    rule_table = zeros((states,RULE_TABLE_SIZE),ubyte)
+    # The dead cells are born and the alive ones survive or start to die, the rest of the
+    # states only advance until the dead state. With 2 states both rows are the same
+    rule_table[0] = alive_table
+    rule_table[1] = where(alive_table,1,2 % states)
+    for state in range(2,states): rule_table[state] = (state+1) % states
+    return rule_table
+
+def rule_states(rule_table) -> int:
+    return len(rule_table)
+
+def is_totalistic(rule_table) -> bool:
+    # The new state only depends on the state of the cell and its count of neighbours
+    index = (arange(RULE_TABLE_SIZE) & ANCHOR_BIT != 0)*9 + NEIGHBOURS_BY_CODE
+    table = zeros(18,ubyte); table[index] = rule_table[0]
+    return bool((table[index] == rule_table[0]).all())
+
+def totalistic_table(rule_table):
+    # Table of 18 entries, at the index state*9 + alive neighbours, for the engines that
+    # count the neighbours of the 2 states instead of converting the neighbourhoods
+    if rule_states(rule_table) > 2: raise ValueError('The rule has more than 2 states')
+    if not is_totalistic(rule_table): raise ValueError('The rule is not outer totalistic')
+    table = zeros(18,ubyte)
+    table[(arange(RULE_TABLE_SIZE) & ANCHOR_BIT != 0)*9 + NEIGHBOURS_BY_CODE] = rule_table[0]
+    return table
@@ -0,0 +1,227 @@
+import time
+import threading
+import numpy as np
+from queue import SimpleQueue, Empty
+
+class SnapshotCells():
+    """Record of the cells for the snapshots, in place of the interface of the cellular automaton
+
+    The automaton gives it the cells that changed as it gives them to the interface, so the
+    snapshots only carry the cells changed since the last one taken. The whole cells only get
+    copied from the automaton to resynchronize, after the commands that replace them
+    """
+
+    # Fraction of the cells changed from which the snapshot carries all the cells instead of the list
+    RESYNC_FRACTION = 1/4
+
+    def __init__(self,cellular_automaton):
+        self.cellular_automaton = cellular_automaton
+        # Copy of the cells as the interface will have them, taken again when resynchronized
+        self.cells = None
+        self.states = 2
+        # Lists of the flat indexes of the cells changed since the last snapshot
+        self.changed_cells = []
+        self.number_changed_cells = 0
+        self.resync = True
+
+    def update_cells_status(self,changed_cells,statuses=None):
+        # Same changes as the ones of the interface (Graphics.update_cells_status)
+        if self.resync: return
+        cells = self.cells.ravel()
+        if statuses is None: cells[changed_cells] ^= 1
+        else: cells[changed_cells] = statuses
+        self.changed_cells.append(changed_cells)
+        self.number_changed_cells += len(changed_cells)
+
+    def set_states(self,states:int):
+        self.states = states
+
+    def reset(self):
+        self.resync = True
+
+    def get_changes(self):
+        # Returns the cells changed since the last call with their states, or a copy of all
+        # the cells when they have to be resynchronized or there are many changes
+        if self.resync:
+            self.cells = self.cellular_automaton.get_cells()
+            self.resync = False
+            changes = (None,self.cells.copy())
+        elif self.number_changed_cells > self.cells.size*SnapshotCells.RESYNC_FRACTION: changes = (None,self.cells.copy())
+        else:
+            changed_cells = np.unique(np.concatenate(self.changed_cells)) if self.changed_cells else np.zeros(0,np.int64)
+            changes = (changed_cells,self.cells.ravel()[changed_cells])
+        self.changed_cells = []
+        self.number_changed_cells = 0
+        return changes
+
+class SimulationThread(threading.Thread):
+    """Thread that computes the generations of a cellular automaton apart from the
+    interface loop, so a slow generation never freezes the window and the simulation
+    isn't limited by the frame rate
+
+    The interface only talks with the thread through two channels:
+        - Commands: functions queued by the interface (cell edits, resets, uploads...)
+          and executed by the thread between generations, so the automaton is only
+          ever touched by the thread
+        - Snapshots: the cells changed since the last snapshot taken, with their states,
+          published by the thread at most once by frame and only once the last one was
+          taken. All the cells only get copied after the commands that replace them
+          (resets, uploads, rules...) or when many of them changed
+
+    The generations run in batches that fit in the time of a frame, waiting between them
+    to keep a target of generations by second, or without waiting in turbo mode
+    """
+
+    # Seconds between each measure of the generations by second achieved
+    SPEED_INTERVAL = 0.5
+
+    def __init__(self,cellular_automaton,target:float=60,turbo:bool=False,density:bool=True,density_logarithm:bool=True,shannon_entropy:bool=True,frame_rate:int=60,checkpoint=None):
+        super().__init__(daemon=True)
+        self.cellular_automaton = cellular_automaton
+        # The counters of the bottom bar get updated by the interface from the snapshots
+        self.cellular_automaton.update_interface = False
+        # The automaton gives the changed cells to the record of the snapshots as to an interface
+        self.snapshot_cells = SnapshotCells(cellular_automaton)
+        self.cellular_automaton.set_game_graphics(self.snapshot_cells)
+        # Commands that give their changes to the record, the rest replace the cells
+        self.tracked_commands = (cellular_automaton.change_cell,cellular_automaton.compute_generations,cellular_automaton.compute_generations_jump)
+        # Statistical analysis computed with the generations
+        self.statistics = (density,density_logarithm,shannon_entropy)
+        # Target of generations by second, in turbo mode they run as fast as possible
+        self.target = target
+        self.turbo = turbo
+        # Each step computes the generations that fit in the time of a frame, by the
+        # time measured for the last generations
+        self.frame_time = 1/frame_rate
+        self.generation_time = None
+        self.next_step = 0
+        # Generations by second achieved, measured at intervals of SPEED_INTERVAL seconds
+        self.speed = 0.0
+        self.speed_generations = 0
+        self.speed_start = time.time()
+        # Status of the thread
+        self.running = False
+        self.done = False
+        self.commands = SimpleQueue()
+        # Last snapshot published, (generations, alive cells, generations by second, number of
+        # states of the rule, changed cells, states), and if it was already taken. Without
+        # changed cells (None) the states are all the cells
+        self.snapshot = None
+        self.snapshot_taken = True
+        self.snapshot_time = 0
+        self.changed = True
+        # Writer of the periodic checkpoints of the run (CheckpointThread), None without them
+        self.checkpoint = checkpoint
+
+    def run(self):
+        if self.checkpoint != None:
+            # A resumed run doesn't save again the state it started with
+            self.checkpoint.last_generations = self.cellular_automaton.generations
+            self.checkpoint.start()
+        while not self.done:
+            # While paused the thread waits for the commands instead of spinning, and
+            # while running it waits the time left for the target speed
+            self.execute_commands(max(0.0,self.next_step-time.time()) if self.running else 0.05)
+            if self.running and not self.done and time.time() >= self.next_step: self.run_step()
+            elif not self.running and self.speed:
+                self.speed = 0.0
+                self.changed = True
+            self.publish_snapshot()
+        # The commands sent before the stop (saves, edits...) get executed before leaving
+        self.execute_commands()
+        # The last state gets saved when the run ends
+        if self.checkpoint != None:
+            if self.cellular_automaton.generations != self.checkpoint.last_generations: self.checkpoint.submit(self.cellular_automaton.get_checkpoint())
+            self.checkpoint.stop()
+
+    def run_step(self):
+        # Generations that fit in a frame, limited to those of the target in that time
+        fit = 1 if self.generation_time == None else max(1,int(self.frame_time/self.generation_time))
+        generations = fit if self.turbo else max(1,min(fit,round(self.target*self.frame_time)))
+        time_start = time.time()
+        self.cellular_automaton.compute_generations(generations,*self.statistics)
+        elapsed = time.time()-time_start
+        # Moving average, so a single slow generation doesn't collapse the batches
+        if self.generation_time == None: self.generation_time = elapsed/generations
+        else: self.generation_time = (self.generation_time + elapsed/generations)/2
+        self.next_step = 0 if self.turbo else time_start + generations/self.target
+        self.changed = True
+        self.update_speed(generations)
+        # The copy of the state gets taken here, the file gets written by the checkpoint thread
+        if self.checkpoint != None and self.checkpoint.due(self.cellular_automaton.generations):
+            self.checkpoint.submit(self.cellular_automaton.get_checkpoint())
+
+    def update_speed(self,generations:int):
+        self.speed_generations += generations
+        elapsed = time.time()-self.speed_start
+        if elapsed >= SimulationThread.SPEED_INTERVAL:
+            self.speed = self.speed_generations/elapsed
+            self.speed_generations = 0
+            self.speed_start = time.time()
+
+    def execute_commands(self,timeout:float=0.0):
+        try: command = self.commands.get(timeout > 0,timeout)
+        except Empty: return
+        while True:
+            function, arguments = command
+            function(*arguments)
+            if function not in self.tracked_commands: self.snapshot_cells.reset()
+            self.changed = True
+            # Every command waiting gets executed before the next generation
+            try: command = self.commands.get_nowait()
+            except Empty: break
+        # The result of the commands gets shown without waiting for the next frame
+        self.snapshot_time = 0
+
+    def publish_snapshot(self):
+        # The changes keep being gathered until the last snapshot gets taken
+        if not self.changed or not self.snapshot_taken or time.time()-self.snapshot_time < self.frame_time: return
+        self.snapshot_time = time.time()
+        self.changed = False
+        self.snapshot = (self.cellular_automaton.generations,self.cellular_automaton.alive_cells,self.speed,self.cellular_automaton.states,*self.snapshot_cells.get_changes())
+        self.snapshot_taken = False
+
+    #
+    # Communication with the interface
+    #
+    def submit(self,function,*arguments):
+        # The function gets executed by the thread before its next generation
+        self.commands.put((function,arguments))
+
+    def get_snapshot(self):
+        # Only returns the snapshots not taken yet, the thread doesn't publish the next one
+        # until this one is marked as taken
+        if self.snapshot_taken: return None
+        snapshot = self.snapshot
+        self.snapshot_taken = True
+        return snapshot
+
+    def play(self):
+        # The speed gets measured from the start of the run
+        self.speed_generations = 0
+        self.speed_start = time.time()
+        self.running = True
+
+    def pause(self):
+        self.running = False
+
+    def set_speed(self,target:float,turbo:bool=False):
+        self.target = target
+        self.turbo = turbo
+        self.next_step = 0
+
+    def stop(self):
+        # Wakes the thread in case it's waiting for a command
+        self.done = True
+        self.submit(lambda: None)
+        self.join()
+
+    # Same interface as the cellular automaton for the interface elements
+    def change_cell(self,index,alive:bool):
+        self.submit(self.cellular_automaton.change_cell,index,alive)
+
+    def compute_generations(self,generations:int):
+        self.submit(self.cellular_automaton.compute_generations,generations,*self.statistics)
+
+    def compute_generations_jump(self,exponent:int):
+        self.submit(self.cellular_automaton.compute_generations_jump,exponent)
@@ -0,0 +1,95 @@
+import os
+import zlib
+import struct
+from numpy import *
+from Rule import rule_string
+
+# Binary files of the evolution space: a header followed by the cells packed 8 by byte
+# by rows, so every row starts in a new byte, and optionally compressed with zlib
+# The spaces with dying cells (states over 1) keep a byte by cell instead
+SPACE_FILE_EXTENSION = '.cas'
+SPACE_FILE_MAGIC = b'CASPACE1'
+# Magic, rows, columns, generations, alive cells, flags and rule (as text)
+SPACE_FILE_HEADER = struct.Struct('<8sIIQQB31s')
+SPACE_FILE_HEADER_RULE = struct.calcsize('<8sIIQQB')
+SPACE_FILE_COMPRESSED = 1
+SPACE_FILE_STATES = 2
+
+def space_file_rule(rule) -> bytes:
+    # The rules in Hensel notation can be longer than the field of the header
+    text = rule_string(rule)
+    if len(text) > SPACE_FILE_HEADER.size-SPACE_FILE_HEADER_RULE: raise ValueError('The rule "{}" is too long for the header of the space file'.format(text))
+    return text.encode('ascii')
+
+def save_space_file(filename, cells, rule, generations:int, alive_cells:int, compressed:bool=False):
+    states = bool(cells.max(initial=0) > 1)
+    packed = ascontiguousarray(cells,ubyte) if states else packbits(cells != 0,axis=1)
+    flags = SPACE_FILE_COMPRESSED*int(compressed) | SPACE_FILE_STATES*int(states)
+    with open(filename,'wb') as file:
+        file.write(SPACE_FILE_HEADER.pack(SPACE_FILE_MAGIC,cells.shape[0],cells.shape[1],generations,alive_cells,flags,space_file_rule(rule)))
+        file.write(zlib.compress(packed.tobytes()) if compressed else packed.tobytes())
+
+def read_space_header(filename) -> dict:
+    with open(filename,'rb') as file:
+        magic, rows, columns, generations, alive_cells, flags, rule = SPACE_FILE_HEADER.unpack(file.read(SPACE_FILE_HEADER.size))
+    if magic != SPACE_FILE_MAGIC: raise ValueError('"{}" is not a space file'.format(filename))
+    return {
+        'rows': rows,
+        'columns': columns,
+        'generations': generations,
+        'alive_cells': alive_cells,
+        'compressed': bool(flags & SPACE_FILE_COMPRESSED),
+        'states': bool(flags & SPACE_FILE_STATES),
+        'rule': rule.rstrip(b'\0').decode('ascii'),
+    }
+
+def load_space_file(filename, start:tuple=(0,0), shape:tuple=None):
+    # Header and cells of the rectangle of shape (rows, columns) from start (row, column)
+    header = read_space_header(filename)
+    if shape == None: shape = (header['rows']-start[0],header['columns']-start[1])
+    row_bytes = header['columns'] if header['states'] else (header['columns']+7)//8
+    if header['compressed']:
+        with open(filename,'rb') as file:
+            file.seek(SPACE_FILE_HEADER.size)
+            packed = frombuffer(zlib.decompress(file.read()),ubyte).reshape(header['rows'],row_bytes)
+    # The uncompressed files get mapped, so only the pages of the rectangle get read
+    else: packed = memmap(filename,ubyte,'r',offset=SPACE_FILE_HEADER.size,shape=(header['rows'],row_bytes))
+    if header['states']: return header, array(packed[start[0]:start[0]+shape[0],start[1]:start[1]+shape[1]])
+    # Only the bytes with the columns of the rectangle get unpacked
+    first_byte = start[1]//8; last_byte = (start[1]+shape[1]+7)//8
+    cells = unpackbits(packed[start[0]:start[0]+shape[0],first_byte:last_byte],axis=1)
+    bit_offset = start[1]-8*first_byte
+    return header, ascontiguousarray(cells[:,bit_offset:bit_offset+shape[1]])
+
+def save_checkpoint(filename, cells, rule, generations:int, alive_cells:int, density_record, density_logarithm_record, shannon_entropy_record):
+    # The state of a run with its statistics, written in a temporary file and renamed
+    # so an interruption never leaves the checkpoint half saved
+    # The cells get packed unless there are dying cells
+    temporary_filename = filename + '.tmp.npz'
+    packed = bool(cells.max(initial=0) <= 1)
+    savez(
+        temporary_filename,
+        cells = packbits(cells != 0,axis=1) if packed else ascontiguousarray(cells,ubyte),
+        packed = bool_(packed),
+        shape = array(cells.shape,int64),
+        rule = array(rule_string(rule)),
+        generations = int64(generations),
+        alive_cells = int64(alive_cells),
+        density = array(density_record,int64),
+        density_logarithm = array(density_logarithm_record,float64),
+        shannon_entropy = array(shannon_entropy_record,float64),
+    )
+    os.replace(temporary_filename,filename)
+
+def load_checkpoint(filename) -> dict:
+    with load(filename) as checkpoint:
+        shape = tuple(int(side) for side in checkpoint['shape'])
+        return {
+            'cells': unpackbits(checkpoint['cells'],axis=1)[:,:shape[1]] if 'packed' not in checkpoint or checkpoint['packed'] else checkpoint['cells'],
+            'rule': str(checkpoint['rule']),
+            'generations': int(checkpoint['generations']),
+            'alive_cells': int(checkpoint['alive_cells']),
+            'density_record': checkpoint['density'].tolist(),
+            'density_logarithm_record': checkpoint['density_logarithm'].tolist(),
+            'shannon_entropy_record': checkpoint['shannon_entropy'].tolist(),
+        }
@@ -0,0 +1,86 @@
+"""
+Check of the CUDA kernels against the numpy implementation, runnable without GPU in the
+CUDA simulator of numba (used by default, NUMBA_ENABLE_CUDASIM=0 runs it in the GPU)
+
+Each case evolves the same random space with both and compares, generation by generation,
+the cells, the alive cells and the histogram of the neighbourhoods of the shannon entropy
+(from the generation kernel, from its own kernel and, when incremental, the updated one).
+In the simulator all the cases take around half an hour
+
+usage: python cuda_check.py --generations 4
+"""
+import os
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
+os.environ.setdefault('NUMBA_ENABLE_CUDASIM','1')
+import sys
+import time
+import argparse
+import warnings
+from contextlib import redirect_stdout
+from numpy import *
+from Constant import BOUNDARIES
+from CPUCellularAutomaton import cpu_boundary_padding, cpu_next_generation, cpu_neighbourhood_codes, cpu_neighbourhood_frecuency
+from CUDACellularAutomaton import CUDACellularAutomaton
+from Rule import compile_rule, rule_states
+warnings.filterwarnings('ignore') # Hides the warnings
+
+# Rules of 2 states, of the Generations family and isotropic in Hensel notation
+RULES = ['B3/S23','B2/S/C3','B3/S2-i34q']
+# (rows, columns, tile size, incremental entropy), the tiles are squared as the spaces
+# of the automaton, a space not squared and one wider than 1024 cells (a row of blocks
+# bigger than a block of threads)
+CASES = [(24,24,0,False),(24,24,8,True),(19,45,0,True),(3,1030,0,False)]
+
+def cpu_generation(space, rule_table, boundary:str):
+    # The histogram of the neighbourhoods before the generation and the new cells, with
+    # the same padded space of the kernels
+    cpu_boundary_padding(space,boundary)
+    neighbourhood_frecuency = cpu_neighbourhood_frecuency(cpu_neighbourhood_codes(space))
+    new_cells, alive_cells, changes_space = cpu_next_generation(space,rule_table)
+    space[1:-1,1:-1] = new_cells
+    return neighbourhood_frecuency
+
+def check_case(rule, boundary:str, rows:int, columns:int, tile_size:int, incremental_entropy:bool, generations:int, seed:int) -> list:
+    # Returns the differences found, empty when the kernels give the same as numpy
+    rule_table = compile_rule(rule)
+    space = zeros((rows+2,columns+2),ubyte)
+    space[1:-1,1:-1] = random.default_rng(seed).integers(0,rule_states(rule_table),(rows,columns))
+    engine = CUDACellularAutomaton(space,(rows,columns),tile_size,incremental_entropy,boundary)
+    engine.initial_configuration(space,int(count_nonzero(space == 1)),rule_table)
+    space = copy(space)
+    differences = []
+    for generation in range(generations):
+        # The first generation runs in a batch, with the histogram of the generation kernel
+        # (without tiles), and the rest with the histogram of its own kernel or the incremental one
+        if generation == 0: neighbourhood_frecuency = engine.next_generations(1,True)[1][0]
+        else:
+            neighbourhood_frecuency = engine.shannon_entropy()
+            engine.next_generation()
+        expected_frecuency = cpu_generation(space,rule_table,boundary)
+        if not array_equal(neighbourhood_frecuency,expected_frecuency): differences.append('histogram of the generation {}'.format(generation))
+        if not array_equal(engine.get_space()[1:-1,1:-1],space[1:-1,1:-1]): differences.append('cells of the generation {}'.format(generation+1))
+        if engine.get_alive_cells() != count_nonzero(space[1:-1,1:-1] == 1): differences.append('alive cells of the generation {}'.format(generation+1))
+    return differences
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Compares the CUDA kernels with the numpy implementation, in the CUDA simulator of numba')
+    parser.add_argument('--generations',type=int,default=4,help='Number of generations compared by case')
+    parser.add_argument('--seed',type=int,default=0,help='Seed of the random spaces')
+    arguments = parser.parse_args(arguments)
+
+    time_start = time.time()
+    failures = 0
+    for rule in RULES:
+        for boundary in BOUNDARIES:
+            for rows, columns, tile_size, incremental_entropy in CASES:
+                case = '{} {} {}x{} tiles {} incremental {}'.format(rule,boundary,rows,columns,tile_size,incremental_entropy)
+                with redirect_stdout(open(os.devnull,'w')):
+                    differences = check_case(rule,boundary,rows,columns,tile_size,incremental_entropy,arguments.generations,arguments.seed)
+                if differences:
+                    failures += 1
+                    print('!!! {}: {} !!!'.format(case,', '.join(differences)))
+                else: print('>> {}: ok'.format(case))
+    print('<--- {} cases with differences ({:.3f}s) --->'.format(failures,time.time()-time_start))
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__": main()
@@ -0,0 +1,97 @@
+"""
+Headless batch runner of the cellular automaton, without the pygame window
+or any graphical element, running the generations as fast as the backend allows
+
+usage: python headless.py --size 300 --rule life --density 0.5 --generations 50 --seed 1 --backend numpy
+       python headless.py --size 256 --generations 4096 --jump 8 --backend hashlife
+"""
+import os
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
+import sys
+import time
+import argparse
+import warnings
+from contextlib import redirect_stdout
+from Constant import *
+from CellularAutomaton import CellularAutomaton
+from Rule import rule_string
+warnings.filterwarnings('ignore') # Hides the warnings
+
+# Rules that can be given by name
+RULES = {
+    'life': R_Life,
+    '2': R_2,
+    'highlife': R_HighLife,
+    'daynight': R_DayAndNight,
+    'seeds': R_Seeds,
+    'tlife': R_tLife,
+    'briansbrain': R_BriansBrain,
+    'starwars': R_StarWars,
+}
+BACKENDS = [BACKEND_NUMPY,BACKEND_NUMBA,BACKEND_BIT,BACKEND_HASHLIFE,BACKEND_CUDA]
+
+def parse_rule(text:str) -> str:
+    # By name, in B/S notation ("B36/S23") or as the 4 comma separated limits
+    # (survive min, survive max, birth min, birth max)
+    if text.lower() in RULES: return RULES[text.lower()]
+    try: return rule_string(text)
+    except ValueError as error: raise argparse.ArgumentTypeError(str(error))
+
+def rule_name(rule) -> str:
+    # The rule without the slash, to be used in the names of the files
+    return rule_string(rule).replace('/','')
+
+def run_simulation(size:int,rule=R_Life,zeros_density:float=0.5,generations:int=50,seed=None,backend:str=BACKEND_NUMPY,tile_size:int=0,workers:int=1,density:bool=True,density_logarithm:bool=True,shannon_entropy:bool=True,boundary:str=BOUNDARY_TOROIDAL,jump:int=0) -> CellularAutomaton:
+    cellular_automaton = CellularAutomaton(size,backend == BACKEND_CUDA,rule,backend=backend,tile_size=tile_size,workers=workers,boundary=boundary)
+    cellular_automaton.update_zeros_density(zeros_density)
+    # The seed makes the random initial configuration reproducible
+    cellular_automaton.random_initial_config(seed=seed)
+    try:
+        # Same order as the main loop, the statistics are taken before each generation
+        if not jump: cellular_automaton.compute_generations(generations,density,density_logarithm,shannon_entropy)
+        # With jumps, before each jump of 2^jump generations
+        else:
+            for i in range(generations >> jump):
+                if density: cellular_automaton.density()
+                if density_logarithm: cellular_automaton.density_logarithm()
+                if shannon_entropy: cellular_automaton.shannon_entropy()
+                cellular_automaton.compute_generations_jump(jump)
+    finally:
+        cellular_automaton.close()
+    return cellular_automaton
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Runs the Game of Life without interface and saves its statistics')
+    parser.add_argument('--size',type=int,default=100,help='Number of cells by side of the space')
+    parser.add_argument('--rule',type=parse_rule,default=R_Life,help='Name of the rule ({}), B/S notation as "B36/S23", Hensel notation as "B3/S2-i34q", Generations as "B2/S/C3" or the 4 limits as "2,3,3,3"'.format(', '.join(RULES)))
+    parser.add_argument('--density',type=float,default=0.5,help='Density of alive cells of the random initial configuration')
+    parser.add_argument('--generations',type=int,default=50,help='Number of generations computed')
+    parser.add_argument('--seed',type=int,default=None,help='Seed of the random initial configuration')
+    parser.add_argument('--backend',choices=BACKENDS,default=BACKEND_NUMPY,help='Backend that computes the generations')
+    parser.add_argument('--tile-size',type=int,default=0,help='Side of the tiles computed only when active (0 disables them)')
+    parser.add_argument('--workers',type=int,default=1,help='Number of processes for the numpy backend')
+    parser.add_argument('--jump',type=int,default=0,metavar='K',help='Advances the generations in jumps of 2^K, at once with the hashlife backend, taking the statistics before each jump')
+    parser.add_argument('--boundary',choices=BOUNDARIES,default=BOUNDARY_TOROIDAL,help='Boundary of the space, the bit and hashlife backends are only toroidal')
+    parser.add_argument('--output',default='./saves',help='Directory of the statistics file')
+    parser.add_argument('--no-entropy',action='store_true',help='Skips the shannon entropy record')
+    parser.add_argument('--quiet',action='store_true',help='Hides the messages of every generation')
+    arguments = parser.parse_args(arguments)
+    if arguments.jump < 0: parser.error('the exponent of the jumps can\'t be negative: {}'.format(arguments.jump))
+
+    os.makedirs(arguments.output,exist_ok=True)
+    filename = os.path.join(arguments.output,'CA_statistics_{0}x{0}_{1}_{2}_{3}.csv'.format(
+        arguments.size,rule_name(arguments.rule),arguments.density,arguments.seed))
+
+    time_start = time.time()
+    with redirect_stdout(open(os.devnull,'w') if arguments.quiet else sys.stdout):
+        # The combinations of backend, rule, boundary and tiles that a backend can't run
+        # are rejected when the automaton is built, and reported as the wrong arguments
+        try:
+            cellular_automaton = run_simulation(
+                arguments.size,arguments.rule,arguments.density,arguments.generations,arguments.seed,
+                arguments.backend,arguments.tile_size,arguments.workers,shannon_entropy=not arguments.no_entropy,boundary=arguments.boundary,jump=arguments.jump)
+        except ValueError as error: parser.error(str(error))
+        cellular_automaton.save_statistics(filename,1 << arguments.jump)
+    print('<--- {} generations in {:.3f}s saved as "{}" --->'.format(cellular_automaton.generations,time.time()-time_start,filename))
+
+if __name__ == "__main__": main()
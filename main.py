@@ -5,12 +5,16 @@ from Graphics import *
 from Constant import *
 from CellularAutomaton import *
 from Layouts import *
+from SimulationThread import SimulationThread
+from CheckpointThread import CheckpointThread
 import time
 import warnings
 warnings.filterwarnings('ignore') # Hides the warnings
 
-# Delay in ms
-DELAY_IN_MS = 1
+# Target of generations by second, in turbo mode the generations run without limit
+# in batches that fit in the time of a frame, showing only the last one of each frame
+TARGET_GENERATIONS_BY_SECOND = 60
+TURBO = False
 # Number of elements by side in the grid
 # the total number of cell is GRID_SIDE_SIZE^2
 GRID_SIDE_ELEMENTS = 50
@@ -20,44 +24,92 @@ GRID_SIZE = 800
 SIDE_BAR_WIDTH = 250
 BOTTOM_BAR_HEIGHT = 25
 WINDOW_TITLE = 'Game of life'
+# Seed of the random configurations, the same seed gives the same configuration (None for a new one each time)
+RANDOM_SEED = None
 # Statistical analysis
 DENSITY = True
 DENSITY_LOGARITHM = True
 SHANNON_ENTROPY = True
-# Use GPU for enhanced performance
+# Keeps the histogram of the neighbourhoods updating only those around the changed cells, which
+# only pays off when few cells change by generation
+INCREMENTAL_ENTROPY = False
+# Use GPU for enhanced performance, without CUDA the numba CPU backend gets used
 GPU_ENHANCEMENT = True
+# Number of processes that compute the bands of the space with the numpy backend
+CPU_WORKERS = 1
+# Backend used when the GPU enhancement is not active (BACKEND_NUMPY, BACKEND_NUMBA, BACKEND_BIT or BACKEND_HASHLIFE)
+CPU_BACKEND = BACKEND_NUMPY
+# Frames by second of the interface, with CUDA or numba the generations of
+# each frame run without copies of the space until the end of the batch
+FRAME_RATE = 60
+# The saves are binary files of the cells packed by bits, compressed they take less space
+# but can't be cropped while loading them. The upload file can be binary, .csv text, or
+# a pattern in RLE (.rle) or plaintext (.cells)
+SAVE_COMPRESSED = False
+UPLOAD_FILENAME = './saves/upload.csv'
+# The run gets saved every CHECKPOINT_GENERATIONS generations or CHECKPOINT_SECONDS seconds
+# (0 disables each one) and when the window gets closed, to be resumed in the next start
+CHECKPOINT = True
+CHECKPOINT_FILENAME = './saves/checkpoint.npz'
+CHECKPOINT_GENERATIONS = 1000
+CHECKPOINT_SECONDS = 60
+RESUME = True
+# Side of the tiles that only get computed when they or their neighbours changed (0 computes the whole space)
+TILE_SIZE = 0
+# Boundary of the space (BOUNDARY_TOROIDAL, BOUNDARY_DEAD, BOUNDARY_REFLECTIVE or BOUNDARY_KLEIN)
+BOUNDARY = BOUNDARY_TOROIDAL
 
 
 
 # Global status variables
-paused = True
-reset = False
-clear = False
-actual_zoom = 1.0
 game_graphics = None
 cellular_automaton = None
-second_start = 0
+simulation = None
 
 def play():
-    global paused,second_start
-    paused = False
-    # second_start = time.time()
+    simulation.play()
 
 def stop():
-    global paused
-    paused = True
+    simulation.pause()
 
 def restart():
-    global reset
-    reset = True
+    game_graphics.reset()
+    # Random configuration again
+    simulation.submit(cellular_automaton.reset)
+    simulation.submit(cellular_automaton.random_initial_config,None,RANDOM_SEED)
 
 def cleared():
-    global clear
-    clear = True
+    game_graphics.reset()
+    simulation.submit(cellular_automaton.reset)
 
 def slider_move():
     SideBar.side_bar.move_drag_button(pygame.mouse.get_pos()[0])
-    cellular_automaton.update_zeros_density(SideBar.side_bar.slider.value)
+    simulation.submit(cellular_automaton.update_zeros_density,SideBar.side_bar.slider.value)
+
+def save_evolution_space():
+    simulation.submit(cellular_automaton.save_evolution_space,SAVE_COMPRESSED)
+
+def upload_evolution_space():
+    simulation.submit(cellular_automaton.upload_evolution_space,UPLOAD_FILENAME)
+
+def update_speed():
+    # The speed controls of the side bar get passed to the simulation
+    if (simulation.target,simulation.turbo) != (SideBar.side_bar.speed_target,SideBar.side_bar.turbo):
+        simulation.set_speed(SideBar.side_bar.speed_target,SideBar.side_bar.turbo)
+
+def update_snapshot():
+    # The last generation published by the simulation gets shown
+    snapshot = simulation.get_snapshot()
+    if snapshot == None: return
+    generations, alive_cells, speed, states, changed_cells, cells_states = snapshot
+    # The colors of the states follow the rule, which can change with the commands (patterns, uploads)
+    if states != game_graphics.states: game_graphics.set_states(states)
+    # Only the cells changed since the last snapshot, or all of them after a resynchronization
+    if changed_cells is None: game_graphics.set_cells(cells_states)
+    else: game_graphics.update_cells_status(changed_cells,cells_states)
+    BottomBar.bottom_bar.update_generations(generations)
+    BottomBar.bottom_bar.update_speed(speed)
+    BottomBar.bottom_bar.update_alive_cells(alive_cells)
 
 def plot_shannons_entropy():
     cellular_automaton.plot_shannons_entropy()
@@ -67,9 +119,7 @@ def set_actual_structure_glider():
     print('>> Change in actual structure')
 
 def main():
-    global paused,reset,clear
-    global actual_zoom
-    global cellular_automaton, game_graphics
+    global cellular_automaton, game_graphics, simulation
     
     # Status variables
     done = False
@@ -92,10 +142,18 @@ def main():
     game_graphics = GameGraphics.get_game_graphics(GRID_SIDE_ELEMENTS, grid, side_bar, bottom_bar)
 
     # Logical part of the program
-    cellular_automaton = CellularAutomaton(GRID_SIDE_ELEMENTS,GPU_ENHANCEMENT)
-    cellular_automaton.random_initial_config(game_graphics.get_cells())
-    cellular_automaton.set_game_graphics(game_graphics)
-    game_graphics.set_cellular_automaton(cellular_automaton)
+    cellular_automaton = CellularAutomaton(GRID_SIDE_ELEMENTS,GPU_ENHANCEMENT,backend=CPU_BACKEND,tile_size=TILE_SIZE,workers=CPU_WORKERS,incremental_entropy=INCREMENTAL_ENTROPY,boundary=BOUNDARY)
+    # The last checkpoint gets resumed when there's one, otherwise it starts from a random configuration
+    if not (RESUME and os.path.exists(CHECKPOINT_FILENAME) and cellular_automaton.resume_checkpoint(CHECKPOINT_FILENAME)):
+        cellular_automaton.random_initial_config(game_graphics.get_cells(),RANDOM_SEED)
+    game_graphics.set_states(cellular_automaton.states)
+    checkpoint = CheckpointThread(CHECKPOINT_FILENAME,CHECKPOINT_GENERATIONS,CHECKPOINT_SECONDS) if CHECKPOINT else None
+    # The generations run in their own thread, the interface only sends it commands
+    # and shows the snapshots it publishes
+    simulation = SimulationThread(cellular_automaton,TARGET_GENERATIONS_BY_SECOND,TURBO,DENSITY,DENSITY_LOGARITHM,SHANNON_ENTROPY,FRAME_RATE,checkpoint)
+    side_bar.set_speed(TARGET_GENERATIONS_BY_SECOND,TURBO)
+    game_graphics.set_cellular_automaton(simulation)
+    simulation.start()
 
     # Side bar functions to buttons
     side_bar.set_click_function(SideBar.PLAY_BUTTON,play)
@@ -106,14 +164,12 @@ def main():
     side_bar.set_click_function(SideBar.DENSITY_BUTTON,cellular_automaton.plot_density)
     side_bar.set_click_function(SideBar.DENSITY_LOGARITHM_BUTTON,cellular_automaton.plot_density_logarithm)
     side_bar.set_click_function(SideBar.ENTROPY_BUTTON,cellular_automaton.plot_shannons_entropy)
-    side_bar.set_click_function(SideBar.SAVE_BUTTON,cellular_automaton.save_evolution_space)
-    side_bar.set_click_function(SideBar.UPLOAD_BUTTON,cellular_automaton.upload_evolution_space)
+    side_bar.set_click_function(SideBar.SAVE_BUTTON,save_evolution_space)
+    side_bar.set_click_function(SideBar.UPLOAD_BUTTON,upload_evolution_space)
     side_bar.set_click_function(SideBar.GLIDER_BUTTON,set_actual_structure_glider)
-    # Bottom bar space dimension and zoom
-    bottom_bar.update_space_dimension_zoom(GRID_SIDE_ELEMENTS,actual_zoom)
-
-    # Delay between each generation
-    delay_start = time.time()
+    side_bar.set_click_function(SideBar.ZOOM_IN_BUTTON,game_graphics.zoom_in)
+    side_bar.set_click_function(SideBar.ZOOM_OUT_BUTTON,game_graphics.zoom_out)
+    side_bar.set_click_function(SideBar.FOCUS_BUTTON,game_graphics.focus)
 
     # Main loop
     while not done:
@@ -121,39 +177,20 @@ def main():
 
         game_graphics.run_logic()
 
+        update_speed()
+        update_snapshot()
+
         game_graphics.display_frame(window)
 
-        clock.tick(60)
-
-        if reset:
-            cellular_automaton.reset()
-            game_graphics.reset()
-            # Random configuration again
-            cellular_automaton.random_initial_config(game_graphics.get_cells())
-            reset = False
-
-        if clear:
-            cellular_automaton.reset()
-            game_graphics.reset()
-            clear = False
-
-        if not paused:
-            if (time.time()-delay_start)*1000 >= DELAY_IN_MS:
-                # Next generation
-                if DENSITY: cellular_automaton.density()
-                if DENSITY_LOGARITHM: cellular_automaton.density_logarithm()
-                if SHANNON_ENTROPY: cellular_automaton.shannon_entropy()
-                cellular_automaton.compute_next_generation()
-                # Restarts delay start time
-                delay_start = time.time()
-        else: delay_start = time.time()
-
-        # if time.time()-second_start >= 1: paused = True
+        clock.tick(FRAME_RATE)
+
         # Changes de window size
         # if cuenta == 60: window = pygame.display.set_mode((500,500),display=window_display)
         # if cuenta == 120: window = pygame.display.set_mode((1200,1000),display=window_display)
         # https://www.pygame.org/docs/ref/display.html
     
+    simulation.stop()
+    cellular_automaton.close()
     pygame.quit()
 
 if __name__ == "__main__": main()
\ No newline at end of file
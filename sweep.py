@@ -0,0 +1,108 @@
+"""
+Parameter sweep of headless simulations across sizes, rules, densities, seeds and
+generations, run by a pool of processes
+
+Every finished run gets saved as a checkpoint, so an interrupted sweep resumes where
+it stopped when launched again with the same checkpoints directory. At the end all
+the records get collected in a single columnar results file (.npz, one array by column)
+
+usage: python sweep.py --sizes 100 300 500 1000 --rules life highlife B3678/S34678 --densities 0.5 --seeds 0 1 2 --generations 25 50
+"""
+import os
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
+import time
+import argparse
+import tempfile
+import warnings
+from itertools import product
+from contextlib import redirect_stdout
+from multiprocessing import Pool
+from numpy import *
+from Constant import *
+from headless import parse_rule, rule_name, run_simulation, BACKENDS
+from CellularAutomaton import CellularAutomaton
+warnings.filterwarnings('ignore') # Hides the warnings
+
+# Columns of the results file, the parameters of the run and its records by generation
+PARAMETER_COLUMNS = ['size','rule','zeros_density','seed','generations']
+RECORD_COLUMNS = ['generation','density','density_logarithm','shannon_entropy']
+
+def run_name(parameters) -> str:
+    size, rule, zeros_density, seed, generations = parameters
+    return 'CA_{0}x{0}_{1}_{2}_{3}_{4}'.format(size,rule_name(rule),zeros_density,seed,generations)
+
+def checkpoint_filename(checkpoints_directory, parameters) -> str:
+    return os.path.join(checkpoints_directory,run_name(parameters)+'.npz')
+
+def sweep_run(task):
+    checkpoints_directory, backend, parameters = task
+    size, rule, zeros_density, seed, generations = parameters
+    with redirect_stdout(open(os.devnull,'w')):
+        cellular_automaton = run_simulation(size,rule,zeros_density,generations,seed,backend)
+    # The checkpoint gets written in a temporary file and renamed, so an interruption
+    # never leaves a run half saved. Each writer gets its own temporary file
+    file_descriptor, temporary_filename = tempfile.mkstemp('.npz',run_name(parameters)+'.tmp.',checkpoints_directory)
+    with os.fdopen(file_descriptor,'wb') as temporary_file:
+        savez(
+            temporary_file,
+            density = array(cellular_automaton.density_record,float64),
+            density_logarithm = array(cellular_automaton.density_logarithm_record,float64),
+            shannon_entropy = array(cellular_automaton.shannon_entropy_record,float64),
+        )
+    os.replace(temporary_filename,checkpoint_filename(checkpoints_directory,parameters))
+    return parameters
+
+def collect_results(checkpoints_directory, grid, output_filename):
+    columns = {column:[] for column in PARAMETER_COLUMNS+RECORD_COLUMNS}
+    for parameters in grid:
+        records = load(checkpoint_filename(checkpoints_directory,parameters))
+        number_records = len(records['density'])
+        for column, value in zip(PARAMETER_COLUMNS,parameters):
+            if column == 'rule': value = rule_name(value)
+            columns[column].append(full(number_records,value))
+        columns['generation'].append(arange(number_records))
+        for column in RECORD_COLUMNS[1:]: columns[column].append(records[column])
+    savez_compressed(output_filename,**{column:concatenate(values) for column, values in columns.items()})
+
+def sweep(grid, checkpoints_directory:str='./saves/sweep', output_filename:str='./saves/sweep_results.npz', workers:int=1, backend:str=BACKEND_NUMPY):
+    # The rules the backend can't run stop the sweep before any run starts
+    rules = {rule_name(parameters[1]):parameters[1] for parameters in grid}
+    for rule in rules.values(): CellularAutomaton.check_rule(backend,rule)
+    os.makedirs(checkpoints_directory,exist_ok=True)
+    # The same rule written in different ways gives the same run, which only gets computed once
+    runs = {}
+    for parameters in grid: runs.setdefault(run_name(parameters),parameters)
+    grid = list(runs.values())
+    # Only the runs without checkpoint get computed
+    pending = [parameters for parameters in grid if not os.path.exists(checkpoint_filename(checkpoints_directory,parameters))]
+    print('<--- {} runs in the sweep, {} already finished --->'.format(len(grid),len(grid)-len(pending)))
+
+    tasks = [(checkpoints_directory,backend,parameters) for parameters in pending]
+    with Pool(workers) as pool:
+        for finished, parameters in enumerate(pool.imap_unordered(sweep_run,tasks),1):
+            print('<--- ({}/{}) {} finished --->'.format(finished,len(tasks),run_name(parameters)))
+
+    collect_results(checkpoints_directory,grid,output_filename)
+    print('<--- Results of the sweep saved as "{}" --->'.format(output_filename))
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Runs a sweep of headless simulations with a pool of processes')
+    parser.add_argument('--sizes',type=int,nargs='+',default=[100],help='Numbers of cells by side of the space')
+    parser.add_argument('--rules',type=parse_rule,nargs='+',default=[R_Life],help='Rules by name, in B/S notation as "B36/S23" or as their 4 limits "2,3,3,3"')
+    parser.add_argument('--densities',type=float,nargs='+',default=[0.5],help='Densities of the random initial configurations')
+    parser.add_argument('--seeds',type=int,nargs='+',default=[0],help='Seeds of the random initial configurations')
+    parser.add_argument('--generations',type=int,nargs='+',default=[50],help='Numbers of generations computed')
+    parser.add_argument('--backend',choices=BACKENDS,default=BACKEND_NUMPY,help='Backend that computes the generations')
+    parser.add_argument('--workers',type=int,default=os.cpu_count(),help='Number of processes running simulations')
+    parser.add_argument('--checkpoints',default='./saves/sweep',help='Directory of the checkpoints of the finished runs')
+    parser.add_argument('--output',default='./saves/sweep_results.npz',help='Columnar results file')
+    arguments = parser.parse_args(arguments)
+
+    grid = list(product(arguments.sizes,arguments.rules,arguments.densities,arguments.seeds,arguments.generations))
+    time_start = time.time()
+    # The rules the backend can't run get reported as the wrong arguments
+    try: sweep(grid,arguments.checkpoints,arguments.output,arguments.workers,arguments.backend)
+    except ValueError as error: parser.error(str(error))
+    print('<--- Sweep finished in {:.3f}s --->'.format(time.time()-time_start))
+
+if __name__ == "__main__": main()